@@ -0,0 +1,132 @@
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is optional: without it only the pure-Python html.parser backend is available
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    from cssselect import GenericTranslator
+except ImportError:
+    GenericTranslator = None
+
+BACKENDS = ("html.parser", "lxml", "lxml-native")
+# Used when no rules are given: the fields a typical article scrape pulls out
+DEFAULT_RULES = [
+    {"name": "title", "css": "title"},
+    {"name": "heading", "css": "h1"},
+    {"name": "links", "css": "a[href]", "attr": "href", "many": True},
+]
+
+def available_backends():
+    if lxml is None:
+        return ["html.parser"]
+    return list(BACKENDS)
+
+def parse(html, backend="html.parser", only=None, encoding=None):
+    """
+    Parses a page with the chosen backend.
+
+    Args:
+        html (str or bytes): Page source. Prefer the raw bytes: lxml rejects
+            text that carries an XML encoding declaration.
+        backend (str): "html.parser" (BeautifulSoup, pure Python), "lxml"
+            (BeautifulSoup on the lxml parser) or "lxml-native" (an lxml tree,
+            no BeautifulSoup objects at all).
+        only (list): Tag names to keep. BeautifulSoup backends skip building
+            everything else (a SoupStrainer partial parse); ignored by lxml-native.
+        encoding (str): Encoding of `html` when it is bytes, if known (e.g. from
+            the Content-Type header); otherwise the parser detects it.
+
+    Returns:
+        A BeautifulSoup object, or an lxml element for "lxml-native".
+    """
+    if backend not in available_backends():
+        raise ValueError(f"Parser backend '{backend}' is not available (have: {', '.join(available_backends())})")
+    if backend == "lxml-native":
+        if isinstance(html, str):
+            html, encoding = html.encode("utf-8"), "utf-8"
+        parser = lxml.html.HTMLParser(encoding=encoding) if encoding else None
+        return lxml.html.fromstring(html, parser=parser)
+    parse_only = SoupStrainer(only) if only else None
+    return BeautifulSoup(html, "lxml" if backend == "lxml" else "html.parser", parse_only=parse_only,
+                         from_encoding=encoding if isinstance(html, bytes) else None)
+
+class Rule:
+    """
+    One field of an extraction record, selected by CSS or XPath.
+
+    Selectors are compiled on construction and reused for every page.
+
+    Args:
+        name (str): Field name in the output record.
+        css (str): CSS selector.
+        xpath (str): XPath expression (lxml-native backend only).
+        attr (str): Attribute to read instead of the element text.
+        many (bool): Collect every match into a list instead of the first one.
+    """
+
+    def __init__(self, name, css=None, xpath=None, attr=None, many=False):
+        if not css and not xpath:
+            raise ValueError(f"Rule '{name}' needs a css or xpath selector")
+        self.name = name
+        self.css = css
+        self.attr = attr
+        self.many = many
+        self.soup_selector = soupsieve.compile(css) if css else None
+        self.lxml_selector = None
+        if lxml is not None:
+            if xpath:
+                self.lxml_selector = etree.XPath(xpath)
+            elif GenericTranslator is not None:
+                self.lxml_selector = etree.XPath(GenericTranslator().css_to_xpath(css))
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(spec["name"], css=spec.get("css"), xpath=spec.get("xpath"), attr=spec.get("attr"),
+                   many=spec.get("many", False))
+
+    def _value(self, element, native):
+        if self.attr:
+            return element.get(self.attr)
+        if native:
+            return element.text_content().strip() if hasattr(element, "text_content") else str(element).strip()
+        return element.get_text(strip=True)
+
+    def apply(self, tree, native):
+        if native:
+            if self.lxml_selector is None:
+                raise ValueError(f"Rule '{self.name}' cannot run on lxml-native (install cssselect or give an xpath)")
+            matches = self.lxml_selector(tree)
+        else:
+            if self.soup_selector is None:
+                raise ValueError(f"Rule '{self.name}' is XPath-only and needs the lxml-native backend")
+            matches = self.soup_selector.select(tree, limit=0 if self.many else 1)
+        values = [self._value(match, native) for match in matches]
+        if self.many:
+            return values
+        return values[0] if values else None
+
+class Extractor:
+    """
+    Turns pages into structured records using a fixed set of compiled rules.
+
+    Args:
+        rules (list): Rule objects (or dicts accepted by Rule.from_dict).
+        backend (str): Parser backend, see parse().
+        only (list): Tag names to restrict BeautifulSoup parsing to. Leave empty
+            unless every rule selects inside those tags.
+    """
+
+    def __init__(self, rules, backend="html.parser", only=None):
+        self.rules = [rule if isinstance(rule, Rule) else Rule.from_dict(rule) for rule in rules]
+        self.backend = backend
+        self.only = only
+
+    def extract(self, html, encoding=None):
+        tree = parse(html, self.backend, only=self.only, encoding=encoding)
+        native = self.backend == "lxml-native"
+        return {rule.name: rule.apply(tree, native) for rule in self.rules}
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_CACHE_DIR = ".http_cache"
+DEFAULT_MAX_BYTES = 512 * 2 ** 20
+
+def _cache_control(headers):
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+def _expires_at(headers, now):
+    # Freshness lifetime from max-age, falling back to Expires; 0 means revalidate every time
+    directives = _cache_control(headers)
+    if "no-cache" in directives:
+        return 0
+    if "max-age" in directives:
+        try:
+            return now + int(directives["max-age"])
+        except ValueError:
+            return 0
+    if "Expires" in headers:
+        try:
+            return parsedate_to_datetime(headers["Expires"]).timestamp()
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+def _build_response(url, status, headers, body):
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+class HttpCache:
+    """
+    On-disk HTTP response cache with conditional revalidation and LRU eviction.
+
+    Bodies are stored as files in `directory`; headers, validators and access
+    times live in a SQLite index next to them. Entries are keyed by URL plus the
+    request headers named in the response's Vary header.
+
+    Args:
+        directory (str): Where bodies and the index are kept.
+        max_bytes (int): Size budget for stored bodies; least recently used entries
+            are evicted once it is exceeded.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT,"
+            " size INTEGER, expires REAL, last_access REAL);"
+            "CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access);"
+            "CREATE TABLE IF NOT EXISTS vary (url TEXT PRIMARY KEY, names TEXT);"
+        )
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _key(self, url, request_headers):
+        row = self.conn.execute("SELECT names FROM vary WHERE url = ?", (url,)).fetchone()
+        names = json.loads(row[0]) if row else []
+        varying = [f"{name}={request_headers.get(name, '')}" for name in names]
+        return hashlib.sha256("\n".join([url] + varying).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _lookup(self, url, request_headers):
+        with self.lock:
+            key = self._key(url, request_headers)
+            row = self.conn.execute("SELECT status, headers, expires FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return key, None
+        try:
+            with open(self._path(key), "rb") as f:
+                body = f.read()
+        except OSError:
+            return key, None
+        return key, (row[0], json.loads(row[1]), row[2], body)
+
+    def _store(self, url, request_headers, response, body, now):
+        directives = _cache_control(response.headers)
+        vary = response.headers.get("Vary", "")
+        if "no-store" in directives or vary.strip() == "*":
+            return
+        names = sorted({name.strip().lower() for name in vary.split(",") if name.strip()})
+        headers = dict(response.headers)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO vary (url, names) VALUES (?, ?)", (url, json.dumps(names)))
+            key = self._key(url, request_headers)
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(body)
+            old = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, url, status, headers, size, expires, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, response.status_code, json.dumps(headers), len(body), _expires_at(response.headers, now), now),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute("SELECT key, size FROM entries ORDER BY last_access LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def _touch(self, key, now, headers=None, expires=None):
+        with self.lock:
+            if headers is None:
+                self.conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            else:
+                self.conn.execute("UPDATE entries SET last_access = ?, headers = ?, expires = ? WHERE key = ?",
+                                  (now, json.dumps(headers), expires, key))
+            self.conn.commit()
+
+    def get(self, session, url, headers=None, **kwargs):
+        """
+        Fetches `url` through the cache.
+
+        Fresh entries are returned without touching the network. Stale entries
+        are revalidated with If-None-Match / If-Modified-Since, and a 304 reply
+        serves the stored body. The returned response has `from_cache` set to
+        True whenever the body came from disk.
+        """
+        request_headers = CaseInsensitiveDict(session.headers)
+        request_headers.update(headers or {})
+        now = time.time()
+        key, cached = self._lookup(url, request_headers)
+
+        conditional = {}
+        if cached is not None:
+            status, cached_headers, expires, body = cached
+            if now < expires:
+                self._touch(key, now)
+                response = _build_response(url, status, cached_headers, body)
+                response.from_cache = True
+                return response
+            cached_headers = CaseInsensitiveDict(cached_headers)
+            if "ETag" in cached_headers:
+                conditional["If-None-Match"] = cached_headers["ETag"]
+            if "Last-Modified" in cached_headers:
+                conditional["If-Modified-Since"] = cached_headers["Last-Modified"]
+
+        response = session.get(url, headers={**(headers or {}), **conditional}, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            # Validators and freshness may be refreshed by the 304, the body may not
+            cached_headers.update(response.headers)
+            self._touch(key, now, dict(cached_headers), _expires_at(cached_headers, now))
+            revalidated = _build_response(url, status, dict(cached_headers), body)
+            revalidated.from_cache = True
+            return revalidated
+
+        response.from_cache = False
+        if response.status_code == 200:
+            self._store(url, request_headers, response, response.content, now)
+        return response
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
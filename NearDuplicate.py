@@ -0,0 +1,133 @@
+import hashlib
+import re
+from array import array
+from collections import Counter
+
+_SKIP_BLOCKS = re.compile(r"<(script|style|noscript)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_TAGS = re.compile(r"<[^>]+>")
+_WORDS = re.compile(r"\w+")
+
+def normalize_text(html):
+    """
+    Cheap text normalization for fingerprinting: drops scripts, styles and tags,
+    lower-cases, and returns the word tokens. No parse tree is built.
+    """
+    text = _TAGS.sub(" ", _SKIP_BLOCKS.sub(" ", html))
+    return _WORDS.findall(text.lower())
+
+def simhash(tokens, shingle=3):
+    """
+    64-bit SimHash over word shingles. Pages that share most of their text
+    end up within a few bits of each other.
+    """
+    if len(tokens) < shingle:
+        shingles = [" ".join(tokens)]
+    else:
+        shingles = {" ".join(tokens[i:i + shingle]) for i in range(len(tokens) - shingle + 1)}
+    digests = b"".join(hashlib.blake2b(feature.encode(), digest_size=8).digest() for feature in shingles)
+    # Bits are counted per byte value rather than per feature: each of the 8 byte
+    # positions has at most 256 distinct values, however many features there are
+    value = 0
+    for position in range(8):
+        ones = [0] * 8
+        for byte, count in Counter(digests[position::8]).items():
+            for bit in range(8):
+                if byte >> bit & 1:
+                    ones[bit] += count
+        shift = (7 - position) * 8
+        for bit in range(8):
+            # A bit is set when more features have it than not
+            if 2 * ones[bit] > len(shingles):
+                value |= 1 << (shift + bit)
+    return value
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+class NearDuplicateIndex:
+    """
+    LSH index of SimHash signatures with bounded memory.
+
+    Signatures are split into max_distance + 1 bands, so any two signatures
+    within max_distance bits agree exactly on at least one band and meet in
+    that band's bucket. Signatures are packed into arrays of 64-bit ints.
+
+    Memory is bounded by keeping two generations: the older one is discarded
+    once the current one holds capacity / 2 signatures, so the index remembers
+    the most recent pages rather than growing without limit.
+
+    Buckets are also capped, at four times the load a generation of random
+    signatures puts on a bucket (and never below `bucket_size`). Only pages
+    that share a band with far more pages than chance would give, such as a
+    boilerplate template, fill one; a full bucket then drops its oldest
+    signature to make room, so new pages are always recorded.
+
+    Args:
+        max_distance (int): Largest Hamming distance still counted as a duplicate.
+        capacity (int): Approximate number of signatures kept across both generations.
+        bucket_size (int): Smallest cap on signatures per bucket.
+    """
+
+    def __init__(self, max_distance=3, capacity=10_000_000, bucket_size=16):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self.band_mask = (1 << self.band_bits) - 1
+        self.capacity = capacity
+        # Expected signatures per bucket in a full generation, rounded up
+        load = -(-(capacity // 2) // (1 << self.band_bits))
+        self.bucket_size = max(bucket_size, 4 * load)
+        self.current = self._new_generation()
+        self.previous = None
+        self.current_count = 0
+
+    def _new_generation(self):
+        return [dict() for _ in range(self.bands)]
+
+    def _band_keys(self, signature):
+        return [(signature >> (band * self.band_bits)) & self.band_mask for band in range(self.bands)]
+
+    def find(self, signature):
+        """
+        Returns (matching_signature, distance) for the closest stored near-duplicate, or None.
+        """
+        keys = self._band_keys(signature)
+        best = None
+        for generation in (self.current, self.previous):
+            if generation is None:
+                continue
+            for band, key in enumerate(keys):
+                for candidate in generation[band].get(key, ()):
+                    distance = hamming(signature, candidate)
+                    if distance <= self.max_distance and (best is None or distance < best[1]):
+                        best = (candidate, distance)
+                        if distance == 0:
+                            return best
+        return best
+
+    def add(self, signature):
+        if self.current_count >= self.capacity // 2:
+            self.previous = self.current
+            self.current = self._new_generation()
+            self.current_count = 0
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self.current[band].get(key)
+            if bucket is None:
+                self.current[band][key] = array("Q", [signature])
+            else:
+                if len(bucket) >= self.bucket_size:
+                    del bucket[0]
+                bucket.append(signature)
+        self.current_count += 1
+
+    def check_and_add(self, signature):
+        """
+        Looks a signature up and records it if it is new.
+
+        Returns:
+            tuple or None: (matching_signature, distance) when the page is a near-duplicate.
+        """
+        match = self.find(signature)
+        if match is None:
+            self.add(signature)
+        return match
@@ -1,22 +1,230 @@
 import argparse
-from scapy.all import ICMP, IP, sr1
+import asyncio
+import ipaddress
+import json
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from scapy.all import ARP, ICMP, IP, TCP, Ether, conf, sr, srp
+from PortScanner import parse_ports, port_scanner, scan
+from ScanState import DEFAULT_STATE_PATH, ScanState
 
-def network_scanner(network):
-    print(f"Scanning network: {network}")
+BATCH_SIZE = 256
+# Ports that are open (or at least answer with RST) on most hosts that drop ICMP
+COMMON_PORTS = [22, 80, 443, 445, 3389, 8080]
+METHODS = ("auto", "arp", "icmp", "tcp")
 
-    for i in range(1, 5):
-        ip = f"{network}.{i}"
-        packet = IP(dst=ip)/ICMP()
-        
-        response = sr1(packet, timeout=1, verbose=0)
-        
-        if response:
-            print(f"Host {ip} is up")
+Host = namedtuple("Host", ["ip", "rtt", "method"])
+
+def expand_network(network):
+    """
+    Expands a network argument into a list of host addresses.
+
+    Accepts either a CIDR block (e.g. "10.0.0.0/22") or the legacy
+    three-octet prefix (e.g. "192.168.1"), which is treated as a /24.
+    """
+    if "/" not in network and network.count(".") == 2:
+        network = f"{network}.0/24"
+    net = ipaddress.ip_network(network, strict=False)
+    hosts = list(net.hosts())
+    # /31 and /32 have no "hosts" in the classic sense, scan the addresses themselves
+    return [str(ip) for ip in (hosts or net)]
+
+class ScapyTransport:
+    """
+    Sends probes on the wire with scapy. Every scan function accepts a
+    transport, so tests and benchmarks can substitute a simulated network
+    (see SimulatedNetwork.py) with the same four methods.
+    """
+
+    def icmp(self, ips, timeout, inter):
+        return self._send_batch([IP(dst=ip)/ICMP() for ip in ips], timeout, inter)
+
+    def syn(self, ips, ports, timeout, inter):
+        # Either a SYN/ACK or a RST proves the host is there
+        packets = [IP(dst=ip)/TCP(dport=port, flags="S") for ip in ips for port in ports]
+        return self._send_batch(packets, timeout, inter)
+
+    def arp(self, ips, timeout):
+        answered, _ = srp(Ether(dst="ff:ff:ff:ff:ff:ff")/ARP(pdst=ips), timeout=timeout, verbose=0)
+        return [(received[ARP].psrc, received.time - sent.sent_time) for sent, received in answered]
+
+    def on_link(self, ip):
+        # A route without a gateway means the address is on a directly connected segment
+        iface, _, gateway = conf.route.route(ip)
+        return gateway == "0.0.0.0" and iface != conf.loopback_name
+
+    def _send_batch(self, packets, timeout, inter):
+        # sr() sends the whole batch and collects replies on a separate thread,
+        # so a batch costs roughly one timeout instead of one per packet
+        answered, _ = sr(packets, timeout=timeout, inter=inter, verbose=0)
+        rtts = {}
+        for sent, received in answered:
+            ip = sent[IP].dst
+            rtt = received.time - sent.sent_time
+            rtts[ip] = min(rtt, rtts.get(ip, rtt))
+        return list(rtts.items())
+
+DEFAULT_TRANSPORT = ScapyTransport()
+
+def sweep(network, probe="icmp", ports=COMMON_PORTS, rate=None, concurrency=4, timeout=1,
+          batch_size=BATCH_SIZE, transport=None):
+    """
+    Sweeps every host in a network, several probe batches in flight at once.
+
+    Args:
+        network (str or list): CIDR block, legacy three-octet prefix or list of addresses.
+        probe (str): "icmp" for echo requests or "tcp" for SYN probes to `ports`.
+        ports (list): Ports used by TCP probes.
+        rate (float): Global cap in packets per second (None for unlimited).
+        concurrency (int): Number of batches probed in parallel.
+        timeout (float): Seconds to wait for replies after a batch is sent.
+        batch_size (int): Number of hosts per batch.
+        transport: Probe backend, ScapyTransport by default.
+
+    Yields:
+        tuple: (ip, rtt_seconds) for every host that replied, as batches complete.
+    """
+    transport = transport or DEFAULT_TRANSPORT
+    hosts = expand_network(network) if isinstance(network, str) else list(network)
+    batches = [hosts[i:i + batch_size] for i in range(0, len(hosts), batch_size)]
+    # Each worker paces its own sends so the workers together stay under the cap
+    inter = concurrency / rate if rate else 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if probe == "tcp":
+            futures = [pool.submit(transport.syn, batch, ports, timeout, inter) for batch in batches]
+        else:
+            futures = [pool.submit(transport.icmp, batch, timeout, inter) for batch in batches]
+        for future in as_completed(futures):
+            for ip, rtt in future.result():
+                yield ip, rtt
+
+def arp_sweep(hosts, timeout=1, transport=None):
+    """
+    Resolves a list of on-link addresses with a single broadcast ARP pass.
+
+    Yields:
+        tuple: (ip, rtt_seconds) for every address that answered.
+    """
+    if not hosts:
+        return
+    for ip, rtt in (transport or DEFAULT_TRANSPORT).arp(hosts, timeout):
+        yield ip, rtt
+
+def discover(network, method="auto", ports=COMMON_PORTS, rate=None, concurrency=4, timeout=1, transport=None):
+    """
+    Finds live hosts, using the cheapest probe that works for each target.
+
+    With method "auto", on-link targets are resolved with one ARP broadcast pass,
+    routed targets get an ICMP sweep, and whatever stays silent is retried with
+    TCP SYN probes to common ports. Any other method runs just that probe type.
+
+    Yields:
+        Host: one entry per live address, as soon as it is found.
+    """
+    transport = transport or DEFAULT_TRANSPORT
+    hosts = expand_network(network) if isinstance(network, str) else list(network)
+    if method == "auto":
+        on_link = {ip for ip in hosts if transport.on_link(ip)}
+        local = [ip for ip in hosts if ip in on_link]
+        routed = [ip for ip in hosts if ip not in on_link]
+        stages = [("arp", local), ("icmp", routed), ("tcp", None)]
+    else:
+        stages = [(method, hosts)]
+
+    found = set()
+    pending = []
+    for name, targets in stages:
+        if targets is None:
+            # Fallback stage: everything the earlier routed probes did not reach
+            targets = [ip for ip in pending if ip not in found]
+        if name == "arp":
+            results = arp_sweep(targets, timeout=timeout, transport=transport)
+        else:
+            results = sweep(targets, probe=name, ports=ports, rate=rate, concurrency=concurrency,
+                            timeout=timeout, transport=transport)
+            if name == "icmp":
+                pending = targets
+        for ip, rtt in results:
+            if ip not in found:
+                found.add(ip)
+                yield Host(ip, rtt, name)
+
+def network_scanner(network, method="icmp", rate=None, concurrency=4, timeout=1, jsonl=False, transport=None):
+    if not jsonl:
+        print(f"Scanning network: {network}")
+
+    for host in discover(network, method=method, rate=rate, concurrency=concurrency, timeout=timeout,
+                         transport=transport):
+        if jsonl:
+            sys.stdout.write(json.dumps({"ip": host.ip, "rtt_ms": round(host.rtt * 1000, 3), "method": host.method}) + "\n")
+            sys.stdout.flush()
+        else:
+            print(f"Host {host.ip} is up ({host.rtt * 1000:.1f} ms, {host.method})")
+
+def incremental_scan(network, state_path=DEFAULT_STATE_PATH, method="icmp", ports=None, rate=None,
+                     concurrency=4, port_concurrency=500, per_host=32, timeout=1, jsonl=False, transport=None):
+    """
+    Rescans a network against the stored state and reports only what changed.
+
+    Known-live hosts are probed first and long-dead hosts are backed off
+    (see ScanState.plan), so periodic sweeps skip most of the silent space.
+    """
+    state = ScanState(state_path)
+    try:
+        targets, skipped = state.plan(expand_network(network))
+        results = {}
+        for host in discover(targets, method=method, rate=rate, concurrency=concurrency, timeout=timeout,
+                             transport=transport):
+            results[host.ip] = (host.rtt, None)
+
+        if ports and results:
+            open_ports = {ip: [] for ip in results}
+            def collect(record):
+                open_ports[record["ip"]].append(record["port"])
+            asyncio.run(scan(list(results), ports, collect, concurrency=port_concurrency, per_host=per_host,
+                             timeout=timeout))
+            results = {ip: (rtt, open_ports[ip]) for ip, (rtt, _) in results.items()}
+
+        diff = state.record(targets, results)
+    finally:
+        state.close()
+
+    for change in diff:
+        if jsonl:
+            sys.stdout.write(json.dumps(change) + "\n")
+        else:
+            details = ", ".join(f"{key}={value}" for key, value in change.items() if key not in ("change", "ip"))
+            print(f"{change['change'].upper():8} {change['ip']} {details}")
+    if not jsonl:
+        print(f"Probed {len(targets)} hosts ({skipped} backed off), {len(results)} up, {len(diff)} changes")
+    return diff
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Simple Network Scanner")
-    parser.add_argument("network", help="Network segment to scan (e.g., 192.168.1)")
+    parser.add_argument("network", help="Network to scan, as CIDR (e.g., 10.0.0.0/22) or segment (e.g., 192.168.1)")
+    parser.add_argument("--method", choices=METHODS, default="icmp", help="Discovery probe to use; 'auto' picks ARP, ICMP or TCP per target")
+    parser.add_argument("--rate", type=float, default=None, help="Maximum packets per second across all workers")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of probe batches in flight at once")
+    parser.add_argument("--timeout", type=float, default=1, help="Seconds to wait for replies to each batch")
+    parser.add_argument("--jsonl", action="store_true", help="Stream live hosts as JSON Lines")
+    parser.add_argument("--ports", help="Port scan the network instead (e.g., 22,80,8000-8100); results stream as JSON Lines")
+    parser.add_argument("--port-concurrency", type=int, default=500, help="Maximum TCP connects in flight when port scanning")
+    parser.add_argument("--per-host", type=int, default=32, help="Maximum TCP connects in flight per host when port scanning")
+    parser.add_argument("--incremental", action="store_true", help="Probe known-live hosts first, back off dead ones and report only changes")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="State file used by --incremental")
 
     args = parser.parse_args()
     network_segment = args.network
-    network_scanner(network_segment)
+    if args.incremental:
+        incremental_scan(network_segment, state_path=args.state, method=args.method,
+                         ports=parse_ports(args.ports) if args.ports else None, rate=args.rate,
+                         concurrency=args.concurrency, port_concurrency=args.port_concurrency,
+                         per_host=args.per_host, timeout=args.timeout, jsonl=args.jsonl)
+    elif args.ports:
+        port_scanner([network_segment], parse_ports(args.ports), concurrency=args.port_concurrency,
+                     per_host=args.per_host, timeout=args.timeout)
+    else:
+        network_scanner(network_segment, method=args.method, rate=args.rate, concurrency=args.concurrency,
+                        timeout=args.timeout, jsonl=args.jsonl)
@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import ipaddress
+import json
+import sys
+import time
+from itertools import islice
+
+# Hosts are scanned in blocks so that per-host state never grows with the size of the target list
+HOST_BLOCK = 256
+
+def parse_ports(spec):
+    """
+    Parses a port specification such as "22,80,8000-8100" into a sorted list.
+    """
+    ports = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            ports.update(range(int(start), int(end) + 1))
+        else:
+            ports.add(int(part))
+    return sorted(port for port in ports if 0 < port < 65536)
+
+def iter_targets(specs):
+    """
+    Lazily yields host addresses from CIDR blocks, single addresses or legacy
+    three-octet prefixes, without materialising whole networks in memory.
+    """
+    for spec in specs:
+        spec = spec.strip()
+        if not spec or spec.startswith("#"):
+            continue
+        if "/" not in spec and spec.count(".") == 2:
+            spec = f"{spec}.0/24"
+        net = ipaddress.ip_network(spec, strict=False)
+        if net.num_addresses <= 2:
+            for ip in net:
+                yield str(ip)
+        else:
+            for ip in net.hosts():
+                yield str(ip)
+
+class RttEstimator:
+    """
+    Smoothed RTT per host (as in TCP's RTO calculation), used to size connect timeouts.
+    """
+
+    def __init__(self, initial=1.0, minimum=0.05, maximum=3.0):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.srtt = None
+        self.rttvar = None
+
+    def update(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def timeout(self):
+        if self.srtt is None:
+            return self.initial
+        return min(self.maximum, max(self.minimum, self.srtt + 4 * self.rttvar))
+
+async def probe(ip, port, timeout):
+    """
+    Attempts a TCP connect and classifies the port.
+
+    Returns:
+        tuple: (state, rtt_seconds) where state is "open", "closed" or "filtered".
+            rtt is None when nothing came back.
+    """
+    start = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    except asyncio.TimeoutError:
+        return "filtered", None
+    except ConnectionRefusedError:
+        return "closed", time.perf_counter() - start
+    except OSError:
+        return "filtered", None
+    rtt = time.perf_counter() - start
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return "open", rtt
+
+async def _scan_block(hosts, ports, emit, concurrency, per_host, estimator_args, report_all):
+    estimators = {ip: RttEstimator(**estimator_args) for ip in hosts}
+    host_limits = {ip: asyncio.Semaphore(per_host) for ip in hosts}
+    # Port-major order spreads consecutive probes across hosts instead of hammering one
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                queue.task_done()
+                return
+            ip, port = item
+            async with host_limits[ip]:
+                estimator = estimators[ip]
+                state, rtt = await probe(ip, port, estimator.timeout())
+            if rtt is not None:
+                estimator.update(rtt)
+            if state == "open" or report_all:
+                emit({"ip": ip, "port": port, "state": state,
+                      "rtt_ms": round(rtt * 1000, 3) if rtt is not None else None})
+            queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    for port in ports:
+        for ip in hosts:
+            await queue.put((ip, port))
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+
+async def scan(targets, ports, emit, concurrency=500, per_host=32, timeout=1.0,
+               min_timeout=0.05, max_timeout=3.0, report_all=False):
+    """
+    Scans ports on a stream of hosts with asyncio connect probes.
+
+    Args:
+        targets (iterable): Host addresses, consumed lazily.
+        ports (list): Ports to probe on every host.
+        emit (callable): Called with a result dict as soon as each finding lands.
+        concurrency (int): Global cap on connects in flight.
+        per_host (int): Cap on connects in flight against a single host.
+        timeout (float): Connect timeout until a host's RTT has been measured.
+        min_timeout (float): Lower bound for the adaptive timeout.
+        max_timeout (float): Upper bound for the adaptive timeout.
+        report_all (bool): Emit closed and filtered ports too, not just open ones.
+    """
+    estimator_args = {"initial": timeout, "minimum": min_timeout, "maximum": max_timeout}
+    targets = iter(targets)
+    while True:
+        hosts = list(islice(targets, HOST_BLOCK))
+        if not hosts:
+            break
+        await _scan_block(hosts, ports, emit, concurrency, per_host, estimator_args, report_all)
+
+def jsonl_writer(stream=sys.stdout):
+    def emit(record):
+        stream.write(json.dumps(record) + "\n")
+        stream.flush()
+    return emit
+
+def port_scanner(targets, ports, concurrency=500, per_host=32, timeout=1.0, report_all=False, stream=sys.stdout):
+    asyncio.run(scan(iter_targets(targets), ports, jsonl_writer(stream), concurrency=concurrency,
+                     per_host=per_host, timeout=timeout, report_all=report_all))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asyncio TCP Port Scanner (JSON Lines output)")
+    parser.add_argument("targets", nargs="*", help="CIDR blocks or addresses to scan (reads stdin if none are given)")
+    parser.add_argument("-p", "--ports", default="1-1024", help="Ports to scan (e.g., 22,80,8000-8100)")
+    parser.add_argument("--concurrency", type=int, default=500, help="Maximum connects in flight")
+    parser.add_argument("--per-host", type=int, default=32, help="Maximum connects in flight per host")
+    parser.add_argument("--timeout", type=float, default=1.0, help="Initial connect timeout in seconds")
+    parser.add_argument("--all", action="store_true", help="Also report closed and filtered ports")
+
+    args = parser.parse_args()
+    port_scanner(args.targets or sys.stdin, parse_ports(args.ports), concurrency=args.concurrency,
+                 per_host=args.per_host, timeout=args.timeout, report_all=args.all)
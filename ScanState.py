@@ -0,0 +1,130 @@
+import sqlite3
+import time
+
+DEFAULT_STATE_PATH = "scan_state.db"
+# Hosts that stop answering are re-probed after BASE_BACKOFF, doubling per miss up to MAX_BACKOFF
+BASE_BACKOFF = 15 * 60
+MAX_BACKOFF = 7 * 24 * 60 * 60
+# An RTT that moves by more than this factor is reported as a change
+RTT_CHANGE_FACTOR = 2.0
+
+class ScanState:
+    """
+    Persistent per-host scan results (last seen, RTT, open ports) backed by SQLite.
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS hosts ("
+            " ip TEXT PRIMARY KEY,"
+            " last_seen REAL,"
+            " last_probed REAL,"
+            " rtt REAL,"
+            " misses INTEGER NOT NULL DEFAULT 0,"
+            " ports TEXT)"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def _rows(self, hosts):
+        rows = {}
+        hosts = list(hosts)
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(hosts), 500):
+            chunk = hosts[i:i + 500]
+            query = f"SELECT ip, last_seen, last_probed, rtt, misses, ports FROM hosts WHERE ip IN ({','.join('?' * len(chunk))})"
+            for row in self.conn.execute(query, chunk):
+                rows[row[0]] = row
+        return rows
+
+    def plan(self, hosts, now=None):
+        """
+        Orders hosts for an incremental scan.
+
+        Known-live hosts come first, then hosts never seen before, then dead hosts
+        whose backoff has expired. Dead hosts still inside their backoff window are
+        left out entirely.
+
+        Returns:
+            tuple: (hosts_to_probe, skipped_count)
+        """
+        now = time.time() if now is None else now
+        rows = self._rows(hosts)
+        live, unknown, dead = [], [], []
+        skipped = 0
+        for ip in hosts:
+            row = rows.get(ip)
+            if row is None:
+                unknown.append(ip)
+                continue
+            _, _, last_probed, _, misses, _ = row
+            if misses == 0:
+                live.append(ip)
+            elif now - (last_probed or 0) >= min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (misses - 1)):
+                dead.append(ip)
+            else:
+                skipped += 1
+        return live + unknown + dead, skipped
+
+    def record(self, probed, results, now=None):
+        """
+        Stores the outcome of a scan and returns what changed since the last one.
+
+        Args:
+            probed (list): Every address that was probed this run.
+            results (dict): ip -> (rtt_seconds, open_ports or None) for hosts that answered.
+                open_ports is None when no port scan was done.
+
+        Returns:
+            list: dicts with a "change" key of "new", "gone" or "changed".
+        """
+        now = time.time() if now is None else now
+        previous = self._rows(probed)
+        diff = []
+        with self.conn:
+            for ip in probed:
+                row = previous.get(ip)
+                was_up = row is not None and row[4] == 0
+                old_ports = _decode_ports(row[5]) if row else None
+                if ip in results:
+                    rtt, ports = results[ip]
+                    if ports is None:
+                        ports = old_ports
+                    if not was_up:
+                        diff.append({"change": "new", "ip": ip, "rtt_ms": round(rtt * 1000, 3), "ports": ports})
+                    else:
+                        change = _compare(row[3], rtt, old_ports, ports)
+                        if change:
+                            diff.append(dict(change="changed", ip=ip, **change))
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO hosts (ip, last_seen, last_probed, rtt, misses, ports) VALUES (?, ?, ?, ?, 0, ?)",
+                        (ip, now, now, rtt, _encode_ports(ports)),
+                    )
+                elif row is None:
+                    self.conn.execute("INSERT INTO hosts (ip, last_probed, misses) VALUES (?, ?, 1)", (ip, now))
+                else:
+                    if was_up:
+                        diff.append({"change": "gone", "ip": ip, "last_seen": row[1]})
+                    self.conn.execute("UPDATE hosts SET last_probed = ?, misses = misses + 1 WHERE ip = ?", (now, ip))
+        return diff
+
+def _encode_ports(ports):
+    return None if ports is None else ",".join(str(port) for port in sorted(ports))
+
+def _decode_ports(text):
+    if text is None:
+        return None
+    return [int(port) for port in text.split(",") if port]
+
+def _compare(old_rtt, rtt, old_ports, ports):
+    change = {}
+    if old_ports is not None and ports is not None and set(old_ports) != set(ports):
+        change["opened"] = sorted(set(ports) - set(old_ports))
+        change["closed"] = sorted(set(old_ports) - set(ports))
+    if old_rtt and rtt and max(old_rtt, rtt) / min(old_rtt, rtt) > RTT_CHANGE_FACTOR:
+        change["rtt_ms"] = round(rtt * 1000, 3)
+        change["previous_rtt_ms"] = round(old_rtt * 1000, 3)
+    return change
@@ -0,0 +1,90 @@
+import ipaddress
+import random
+import threading
+import time
+import zlib
+
+class SimulatedTransport:
+    """
+    Offline stand-in for ScapyTransport that models a network instead of touching one.
+
+    Host properties are derived from a hash of the address and the seed, so a
+    simulated /16 costs no memory and every run sees the same network.
+
+    Args:
+        alive (float): Fraction of addresses that are up.
+        icmp_blocked (float): Fraction of live hosts that drop ICMP (still reachable over TCP).
+        latency_ms (float): Median round-trip time.
+        jitter (float): Sigma of the log-normal latency distribution.
+        loss (float): Probability that any single probe or reply is lost.
+        on_link (str): CIDR block treated as directly connected (ARP-able), or None.
+        time_scale (float): Multiplier applied to every simulated wait, so benchmarks
+            of large sweeps finish quickly while keeping relative costs intact.
+        seed (int): Selects which hosts are up and how they behave.
+    """
+
+    def __init__(self, alive=0.3, icmp_blocked=0.2, latency_ms=2.0, jitter=0.5, loss=0.01,
+                 on_link=None, time_scale=1.0, seed=0):
+        self.alive = alive
+        self.icmp_blocked = icmp_blocked
+        self.latency = latency_ms / 1000
+        self.jitter = jitter
+        self.loss = loss
+        self.local_net = ipaddress.ip_network(on_link) if on_link else None
+        self.time_scale = time_scale
+        self.seed = seed
+        self.first_reply = None
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def _roll(self, ip, salt):
+        # Stable per-address pseudo-random number in [0, 1)
+        return zlib.crc32(f"{self.seed}:{salt}:{ip}".encode()) / 2 ** 32
+
+    def is_alive(self, ip):
+        return self._roll(ip, "alive") < self.alive
+
+    def _rtt(self):
+        with self._lock:
+            return self.latency * self._rng.lognormvariate(0, self.jitter)
+
+    def _lost(self):
+        with self._lock:
+            return self._rng.random() < self.loss
+
+    def _wait(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def _answer(self, ips, reachable, probes_per_host, timeout, inter):
+        self._wait(inter * len(ips) * probes_per_host)
+        replies = []
+        for ip in ips:
+            if not reachable(ip):
+                continue
+            rtts = [self._rtt() for _ in range(probes_per_host) if not self._lost()]
+            rtts = [rtt for rtt in rtts if rtt <= timeout]
+            if rtts:
+                replies.append((ip, min(rtts)))
+        # Like sr(), a batch always waits out the full timeout after the last send
+        self._wait(timeout)
+        if replies:
+            with self._lock:
+                if self.first_reply is None:
+                    self.first_reply = time.perf_counter()
+        return replies
+
+    def icmp(self, ips, timeout, inter):
+        reachable = lambda ip: self.is_alive(ip) and self._roll(ip, "icmp") >= self.icmp_blocked
+        return self._answer(ips, reachable, 1, timeout, inter)
+
+    def syn(self, ips, ports, timeout, inter):
+        return self._answer(ips, self.is_alive, len(ports), timeout, inter)
+
+    def arp(self, ips, timeout):
+        # ARP is answered by every live on-link host, ICMP filtering or not
+        reachable = lambda ip: self.is_alive(ip) and self.on_link(ip)
+        return self._answer(ips, reachable, 1, timeout, 0)
+
+    def on_link(self, ip):
+        return self.local_net is not None and ipaddress.ip_address(ip) in self.local_net
@@ -1,24 +1,376 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from urllib.parse import urldefrag, urljoin, urlsplit, urlunsplit
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from HttpCache import DEFAULT_CACHE_DIR, HttpCache
+from HtmlExtract import DEFAULT_RULES, Extractor, available_backends, parse
+from NearDuplicate import NearDuplicateIndex, normalize_text, simhash
+
+USER_AGENT = "WebScraper/1.0"
+
+def make_session(pool_size=100):
+    """
+    Creates a requests session that keeps pooled keep-alive connections for up
+    to `pool_size` hosts (and up to `pool_size` per host), so repeated fetches
+    skip the TCP/TLS handshake.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+def scrape_website(url, session=None, cache=None, backend='html.parser'):
+    # Send a GET request to the website (through the on-disk cache when one is given)
+    if cache is not None:
+        response = cache.get(session or make_session(), url)
+    else:
+        response = (session or requests).get(url)
 
-def scrape_website(url):
-    # Send a GET request to the website
-    response = requests.get(url)
-    
     # Check if the request was successful
     if response.status_code == 200:
-        # Parse the HTML content using BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
+        # Parse the HTML content using BeautifulSoup (lxml is much faster when installed)
+        soup = parse(response.text, backend if backend != 'lxml-native' else 'lxml')
+
         # Find all article titles (adjust the selector based on the website's structure)
         titles = soup.find()
         print(titles.get_text())
+        return titles.get_text()
         # Print out each title
     #     for title in titles:
     #         print(title.get_text())
     # else:
     #     print(f"Failed to retrieve the page. Status code: {response.status_code}")
 
-# URL of the website you want to scrape
-url = 'https://jarrarcpa.com/about-us/'
-scrape_website(url)
+def normalize_url(url):
+    # Canonical form used for de-duplication: no fragment, lower-case scheme/host, no default port
+    url, _ = urldefrag(url)
+    parts = urlsplit(url)
+    netloc = parts.netloc.lower()
+    if (parts.scheme == "http" and netloc.endswith(":80")) or (parts.scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or "/", parts.query, ""))
+
+def load_sitemap(url, session):
+    """
+    Returns every page URL listed in a sitemap, following nested sitemap indexes.
+    """
+    response = session.get(url, timeout=30)
+    response.raise_for_status()
+    root = ET.fromstring(response.content)
+    urls = []
+    for loc in root.iter():
+        if loc.tag.endswith("loc") and loc.text:
+            if root.tag.endswith("sitemapindex"):
+                urls.extend(load_sitemap(loc.text.strip(), session))
+            else:
+                urls.append(loc.text.strip())
+    return urls
+
+class Crawler:
+    """
+    Concurrent crawler sharing one pooled session across worker threads.
+
+    Args:
+        concurrency (int): Global cap on requests in flight.
+        per_host (int): Cap on requests in flight to any one host.
+        delay (float): Minimum seconds between request starts to the same host.
+        max_pages (int): Stop after this many pages have been fetched (None for no limit).
+        follow_links (bool): Queue same-host links found on fetched pages.
+        timeout (float): Per-request timeout in seconds.
+        cache (HttpCache): Serve and revalidate pages through this cache (optional).
+        extractor (Extractor): Adds a structured "record" to every page (optional).
+        backend (str): Parser backend used for link discovery.
+    """
+
+    def __init__(self, concurrency=64, per_host=4, delay=0.0, max_pages=None, follow_links=True, timeout=30,
+                 cache=None, extractor=None, backend="html.parser"):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.max_pages = max_pages
+        self.follow_links = follow_links
+        self.timeout = timeout
+        self.cache = cache
+        self.extractor = extractor
+        self.backend = backend
+        self.session = make_session(pool_size=concurrency)
+        self.seen = set()
+        # Frontier is kept per host so one slow or rate-limited site cannot starve the others
+        self.frontier = {}
+        self.in_flight = {}
+        self.next_start = {}
+
+    def add(self, url):
+        url = normalize_url(url)
+        if url in self.seen or urlsplit(url).scheme not in ("http", "https"):
+            return False
+        self.seen.add(url)
+        self.frontier.setdefault(urlsplit(url).netloc, deque()).append(url)
+        return True
+
+    def _ready_urls(self, budget):
+        now = time.monotonic()
+        ready = []
+        for host, queue in list(self.frontier.items()):
+            while queue and len(ready) < budget and self.in_flight.get(host, 0) < self.per_host \
+                    and self.next_start.get(host, 0) <= now:
+                ready.append(queue.popleft())
+                self.in_flight[host] = self.in_flight.get(host, 0) + 1
+                self.next_start[host] = now + self.delay
+            if not queue:
+                del self.frontier[host]
+        return ready
+
+    def fetch(self, url):
+        try:
+            if self.cache is not None:
+                response = self.cache.get(self.session, url, timeout=self.timeout)
+            else:
+                response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            return {"url": url, "error": str(e)}
+        page = {"url": url, "status": response.status_code, "html": response.text, "links": [],
+                "from_cache": getattr(response, "from_cache", False)}
+        content_type = response.headers.get("Content-Type", "")
+        # An empty body has no links or record (and lxml refuses to parse it)
+        is_html = response.status_code == 200 and "html" in content_type and response.content.strip()
+        # Parse the raw bytes, in the declared charset if there is one, or let the parser detect it
+        encoding = response.encoding if "charset" in content_type.lower() else None
+        try:
+            if self.follow_links and is_html:
+                if self.backend == "lxml-native":
+                    hrefs = parse(response.content, self.backend, encoding=encoding).xpath("//a/@href")
+                else:
+                    # Only <a> tags are needed, so skip building the rest of the tree
+                    tree = parse(response.content, self.backend, only=["a"], encoding=encoding)
+                    hrefs = [a["href"] for a in tree.find_all("a", href=True)]
+                page["links"] = [urljoin(response.url, href) for href in hrefs]
+            if self.extractor is not None and is_html:
+                page["record"] = self.extractor.extract(response.content, encoding=encoding)
+        except Exception as e:
+            # One unparseable page must not abort the crawl
+            page["error"] = f"parse failed: {e}"
+        return page
+
+    def crawl(self, seeds):
+        """
+        Crawls from the seed URLs and yields one result dict per fetched page.
+        """
+        for url in seeds:
+            self.add(url)
+        fetched = 0
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while self.frontier or futures:
+                budget = self.concurrency - len(futures)
+                if self.max_pages is not None:
+                    budget = min(budget, self.max_pages - fetched - len(futures))
+                for url in self._ready_urls(budget):
+                    futures[pool.submit(self.fetch, url)] = url
+                if not futures:
+                    if self.max_pages is not None and fetched >= self.max_pages:
+                        break
+                    # Everything left is waiting on a per-host delay
+                    time.sleep(min(self.delay, 0.05) or 0.01)
+                    continue
+                done, _ = wait(futures, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = futures.pop(future)
+                    host = urlsplit(url).netloc
+                    self.in_flight[host] -= 1
+                    page = future.result()
+                    fetched += 1
+                    for link in page.get("links", []):
+                        if urlsplit(normalize_url(link)).netloc == host:
+                            self.add(link)
+                    yield page
+
+def _url_key(url):
+    # 8-byte digests keep the completed-URL set small enough for millions of entries
+    return int.from_bytes(hashlib.blake2b(url.encode(), digest_size=8).digest(), "big")
+
+def load_checkpoint(path):
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                done.add(_url_key(line.rstrip("\n")))
+    return done
+
+def _batch_fetch(session, cache, url, timeout):
+    try:
+        if cache is not None:
+            response = cache.get(session, url, timeout=timeout)
+        else:
+            response = session.get(url, timeout=timeout)
+    except requests.RequestException as e:
+        return "error", {"url": url, "error": str(e)}
+    return "fetched", (url, response.status_code, response.headers.get("Content-Type", ""), response.text)
+
+_worker_extractor = None
+
+def _init_extract_worker(rules, backend):
+    global _worker_extractor
+    _worker_extractor = Extractor(rules, backend=backend)
+
+def _batch_fingerprint(url, status, html):
+    return "fingerprinted", (url, status, html, simhash(normalize_text(html)))
+
+def _batch_extract(url, status, html, duplicate=None):
+    try:
+        result = {"url": url, "status": status, "record": _worker_extractor.extract(html)}
+    except Exception as e:
+        result = {"url": url, "status": status, "error": f"extract failed: {e}"}
+    if duplicate:
+        result["near_duplicate"] = duplicate
+    return "record", result
+
+def batch_scrape(urls, output, checkpoint=None, rules=None, backend="html.parser", fetch_workers=32,
+                 parse_workers=None, queue_size=256, timeout=30, cache=None, dedup=None, dedup_index=None):
+    """
+    Fetches a stream of URLs and writes one JSON line per page to `output`.
+
+    Fetching runs on a thread pool and parsing on a process pool, so HTML
+    parsing is not serialized on the GIL. At most `queue_size` pages are
+    fetched or parsed at any moment; input is only read as that window drains,
+    which keeps memory flat for arbitrarily long URL lists. Finished URLs are
+    appended to `checkpoint` after their record is written, and are skipped
+    when the job is restarted. Network errors are written but not checkpointed,
+    so they are retried on the next run.
+
+    With `dedup` set to "skip" or "tag", every page gets a SimHash fingerprint
+    on the process pool, checked against a NearDuplicateIndex in this process
+    before extraction.
+    Near-duplicates are either written without a record ("skip") or extracted
+    and marked ("tag"); both carry a "near_duplicate" field.
+
+    Returns:
+        int: Number of records written.
+    """
+    checkpoint = checkpoint or output + ".done"
+    done = load_checkpoint(checkpoint)
+    if dedup and dedup_index is None:
+        dedup_index = NearDuplicateIndex()
+    session = make_session(pool_size=fetch_workers)
+    written = 0
+    urls = iter(urls)
+    exhausted = False
+    pending = set()
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetchers, \
+            ProcessPoolExecutor(max_workers=parse_workers, initializer=_init_extract_worker,
+                                initargs=(rules or DEFAULT_RULES, backend)) as parsers, \
+            open(output, "a", encoding="utf-8") as out, open(checkpoint, "a", encoding="utf-8") as ckpt:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < queue_size:
+                url = next(urls, None)
+                if url is None:
+                    exhausted = True
+                    break
+                url = url.strip()
+                if not url or url.startswith("#") or _url_key(url) in done:
+                    continue
+                done.add(_url_key(url))
+                pending.add(fetchers.submit(_batch_fetch, session, cache, url, timeout))
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                kind, payload = future.result()
+                if kind == "fetched":
+                    url, status, content_type, html = payload
+                    if status == 200 and "html" in content_type:
+                        if dedup:
+                            # Fingerprinting is pure Python, so it runs on the parsers, not the fetch threads
+                            pending.add(parsers.submit(_batch_fingerprint, url, status, html))
+                        else:
+                            pending.add(parsers.submit(_batch_extract, url, status, html))
+                        continue
+                    kind, payload = "record", {"url": url, "status": status}
+                elif kind == "fingerprinted":
+                    url, status, html, signature = payload
+                    duplicate = None
+                    match = dedup_index.check_and_add(signature)
+                    if match is not None:
+                        duplicate = {"simhash": f"{match[0]:016x}", "distance": match[1]}
+                    if not (duplicate and dedup == "skip"):
+                        pending.add(parsers.submit(_batch_extract, url, status, html, duplicate))
+                        continue
+                    kind, payload = "record", {"url": url, "status": status, "near_duplicate": duplicate}
+                out.write(json.dumps(payload) + "\n")
+                written += 1
+                if kind == "record":
+                    # The record is flushed before the checkpoint so a crash never loses a checkpointed page
+                    out.flush()
+                    ckpt.write(payload["url"] + "\n")
+                    ckpt.flush()
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Web Scraper")
+    # URL of the website you want to scrape
+    parser.add_argument("urls", nargs="*", default=['https://jarrarcpa.com/about-us/'], help="Page(s) to scrape, or crawl seeds")
+    parser.add_argument("--crawl", action="store_true", help="Crawl from the given URLs instead of scraping a single page")
+    parser.add_argument("--sitemap", help="Seed the crawl from a sitemap URL")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+    parser.add_argument("--per-host", type=int, default=4, help="Maximum requests in flight per host")
+    parser.add_argument("--delay", type=float, default=0.0, help="Minimum seconds between requests to the same host")
+    parser.add_argument("--max-pages", type=int, default=None, help="Stop after this many pages")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_DIR, help="Cache responses on disk (default directory: .http_cache)")
+    parser.add_argument("--cache-size", type=int, default=512, help="Cache size budget in MB")
+    parser.add_argument("--parser", choices=available_backends(), default="html.parser", help="HTML parser backend")
+    parser.add_argument("--rules", help="JSON file with extraction rules, e.g. [{\"name\": \"title\", \"css\": \"h1\"}]")
+    parser.add_argument("--batch", metavar="FILE", help="Scrape every URL in FILE ('-' for stdin) and write JSON Lines")
+    parser.add_argument("-o", "--output", default="scraped.jsonl", help="Output file for --batch")
+    parser.add_argument("--checkpoint", help="Completed-URL log for --batch (default: OUTPUT.done)")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Parser processes for --batch (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=256, help="Pages in flight between fetching and writing for --batch")
+    parser.add_argument("--dedup", choices=("skip", "tag"), help="Detect near-duplicate pages in --batch and skip or tag them")
+    parser.add_argument("--dedup-distance", type=int, default=3, help="Max SimHash bit distance counted as a near-duplicate")
+    parser.add_argument("--dedup-capacity", type=int, default=10_000_000, help="Approximate number of fingerprints remembered")
+
+    args = parser.parse_args()
+    cache = HttpCache(args.cache, max_bytes=args.cache_size * 2 ** 20) if args.cache else None
+    if args.batch:
+        rules = None
+        if args.rules:
+            with open(args.rules) as f:
+                rules = json.load(f)
+        dedup_index = None
+        if args.dedup:
+            dedup_index = NearDuplicateIndex(max_distance=args.dedup_distance, capacity=args.dedup_capacity)
+        source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+        with source:
+            count = batch_scrape(source, args.output, checkpoint=args.checkpoint, rules=rules, backend=args.parser,
+                                 fetch_workers=args.concurrency, parse_workers=args.parse_workers,
+                                 queue_size=args.queue_size, cache=cache, dedup=args.dedup,
+                                 dedup_index=dedup_index)
+        print(f"Wrote {count} records to {args.output}", file=sys.stderr)
+    elif args.crawl or args.sitemap:
+        extractor = None
+        if args.rules:
+            with open(args.rules) as f:
+                extractor = Extractor(json.load(f), backend=args.parser)
+        crawler = Crawler(concurrency=args.concurrency, per_host=args.per_host, delay=args.delay, max_pages=args.max_pages,
+                          cache=cache, extractor=extractor, backend=args.parser)
+        seeds = list(args.urls)
+        if args.sitemap:
+            seeds.extend(load_sitemap(args.sitemap, crawler.session))
+        for page in crawler.crawl(seeds):
+            print(page["url"], page.get("status", page.get("error")), "(cached)" if page.get("from_cache") else "",
+                  json.dumps(page["record"]) if "record" in page else "")
+    else:
+        for url in args.urls:
+            scrape_website(url, cache=cache, backend=args.parser)
@@ -0,0 +1,156 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Runs without a display: the highlighter needs a QApplication but no window
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication, QPlainTextDocumentLayout
+from PyQt5.QtGui import QTextCursor, QTextDocument
+from editor import QtSyntaxHighlighter
+from syntax_highlight import LANGUAGES
+
+SAMPLES = {
+    "Python": [
+        "@decorator",
+        "def handler(request, retries=3):",
+        '    """Docstring spanning',
+        '    two lines."""',
+        "    for attempt in range(retries):  # retry loop",
+        "        value = request.get('key', 0x1F) + 2.5e3",
+        "        if isinstance(value, float) and value > 10:",
+        '            return f"done {value}"',
+        "    raise ValueError('gave up')",
+        "",
+    ],
+    "JSON": [
+        "{",
+        '  "name": "service",',
+        '  "replicas": 3,',
+        '  "enabled": true,',
+        '  "limits": {"cpu": 0.5, "memory": null},',
+        '  "tags": ["a", "b", "c"]',
+        "},",
+    ],
+    "YAML": [
+        "- name: web  # front end",
+        "  image: &img nginx:1.25",
+        "  replicas: 3",
+        "  enabled: yes",
+        "  script: |",
+        "    echo starting",
+        "    run --port 8080",
+        "  base: *img",
+    ],
+    "Log": [
+        "2024-05-01 12:00:00,001 INFO server started on port 8080",
+        "2024-05-01 12:00:01,017 DEBUG request \"GET /\" took 3 ms",
+        "2024-05-01 12:00:02,500 WARNING slow response",
+        "2024-05-01 12:00:03,250 ERROR request failed",
+        "Traceback (most recent call last):",
+        '  File "app.py", line 10, in handle',
+        "ValueError: bad input",
+    ],
+}
+
+class TimedHighlighter(QtSyntaxHighlighter):
+    """
+    Counts the blocks the highlighter re-lexes and the time it spends on them.
+    """
+
+    def __init__(self, document, language):
+        super().__init__(document, language)
+        self.blocks = 0
+        self.seconds = 0.0
+
+    def highlightBlock(self, text):
+        start = time.perf_counter()
+        super().highlightBlock(text)
+        self.seconds += time.perf_counter() - start
+        self.blocks += 1
+
+def make_document(app, language, lines):
+    """
+    Loads `lines` lines of sample text into a highlighted document, the way
+    the editor opens a file: highlighter first, then the text.
+    """
+    sample = SAMPLES[language.name]
+    text = "\n".join(sample[i % len(sample)] for i in range(lines))
+    document = QTextDocument()
+    # Highlighting is only triggered by documents that have a layout. This is the plain-text
+    # layout, not the QTextEdit one the editor uses; see benchmark()
+    document.setDocumentLayout(QPlainTextDocumentLayout(document))
+    highlighter = TimedHighlighter(document, language)
+    # The highlighter's deferred first pass must be done, or it skips the edits before it
+    app.processEvents()
+    start = time.perf_counter()
+    document.setPlainText(text)
+    return document, highlighter, time.perf_counter() - start
+
+def time_keystrokes(document, highlighter, keystrokes):
+    """
+    Types `keystrokes` characters, then deletes them, in the middle of the
+    document.
+
+    Returns:
+        tuple: (median seconds per keystroke in the highlighter, blocks re-lexed
+            per keystroke, median seconds per keystroke overall).
+    """
+    block = document.findBlockByNumber(document.blockCount() // 2)
+    cursor = QTextCursor(block)
+    cursor.movePosition(QTextCursor.EndOfBlock)
+    highlighter.blocks = 0
+    highlighting, overall = [], []
+    for i in range(keystrokes):
+        highlighter.seconds = 0.0
+        start = time.perf_counter()
+        if i < keystrokes // 2:
+            cursor.insertText("x")
+        else:
+            cursor.deletePreviousChar()
+        overall.append(time.perf_counter() - start)
+        highlighting.append(highlighter.seconds)
+    return statistics.median(highlighting), highlighter.blocks / keystrokes, statistics.median(overall)
+
+def benchmark(args):
+    """
+    Measures only the highlighter's share of a keystroke: the time spent in
+    highlightBlock and the number of blocks it re-lexes. That is what is
+    asserted to stay flat.
+
+    The "keystroke" column is the whole edit, shown for reference only. It is
+    measured on a QPlainTextDocumentLayout document, not the QTextEdit layout
+    the editor uses, and it is not flat on either: Qt's layout cost per edit
+    grows with document size whether or not anything is highlighted, and far
+    more steeply under QTextEdit.
+    """
+    app = QApplication.instance() or QApplication(sys.argv)
+    print(f"{'language':10} {'lines':>8} {'full pass':>10} {'highlight':>11} {'blocks':>7} {'vs smallest':>12} {'keystroke':>11}")
+    failures = []
+    for name in args.languages:
+        language = LANGUAGES[name]
+        baseline = None
+        for lines in args.sizes:
+            document, highlighter, full = make_document(app, language, lines)
+            per_key, blocks, overall = time_keystrokes(document, highlighter, args.keystrokes)
+            baseline = baseline or (per_key, blocks)
+            ratio = per_key / baseline[0]
+            print(f"{name:10} {lines:8} {full * 1000:8.0f}ms {per_key * 1e6:9.1f}us {blocks:7.2f} {ratio:11.2f}x {overall * 1e6:9.1f}us")
+            # The slack keeps timer noise on tiny timings from failing the check
+            if per_key > baseline[0] * args.tolerance + args.slack / 1e6 or blocks > baseline[1]:
+                failures.append(f"{name} at {lines} lines: {per_key * 1e6:.1f}us and {blocks:.2f} blocks per keystroke, "
+                                f"vs {baseline[0] * 1e6:.1f}us and {baseline[1]:.2f} blocks")
+    assert not failures, "Per-keystroke highlighting grew with document size:\n" + "\n".join(failures)
+    print("Per-keystroke highlighting stayed flat")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that syntax highlighting cost per keystroke does not grow with document size")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000], help="Document sizes in lines, smallest first")
+    parser.add_argument("--languages", nargs="+", default=list(LANGUAGES), choices=list(LANGUAGES))
+    parser.add_argument("--keystrokes", type=int, default=400, help="Keystrokes timed per document (half typing, half deleting)")
+    parser.add_argument("--tolerance", type=float, default=3.0, help="Allowed ratio to the smallest document's per-keystroke time")
+    parser.add_argument("--slack", type=float, default=50.0, help="Extra microseconds allowed on top of the ratio")
+
+    benchmark(parser.parse_args())
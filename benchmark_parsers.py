@@ -0,0 +1,56 @@
+import argparse
+import glob
+import json
+import os
+import time
+from HtmlExtract import DEFAULT_RULES, Extractor, available_backends
+
+def load_corpus(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "**", "*.htm*"), recursive=True)):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    return pages
+
+def time_backend(extractor, pages, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in pages:
+            extractor.extract(html)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def benchmark(pages, rules, repeat, only=None):
+    total_bytes = sum(len(html) for html in pages)
+    print(f"{len(pages)} pages, {total_bytes / 2 ** 20:.1f} MB")
+    print(f"{'backend':24} {'pages/sec':>10} {'MB/sec':>8} {'speedup':>8}")
+    variants = [(backend, None) for backend in available_backends()]
+    if only:
+        variants += [(backend, only) for backend in available_backends() if backend != "lxml-native"]
+    baseline = None
+    for backend, parse_only in variants:
+        try:
+            extractor = Extractor(rules, backend=backend, only=parse_only)
+            elapsed = time_backend(extractor, pages, repeat)
+        except ValueError as e:
+            print(f"{backend:24} skipped: {e}")
+            continue
+        baseline = baseline or elapsed
+        label = backend + (" (partial)" if parse_only else "")
+        print(f"{label:24} {len(pages) / elapsed:10.1f} {total_bytes / 2 ** 20 / elapsed:8.2f} {baseline / elapsed:7.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare HTML parser backends on a corpus of saved pages")
+    parser.add_argument("corpus", help="Directory of saved .html pages")
+    parser.add_argument("--rules", help="JSON file with extraction rules (defaults to title/h1/links)")
+    parser.add_argument("--only", nargs="+", help="Also time a partial parse keeping only these tags (e.g., title h1 a)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per backend; the best one is reported")
+
+    args = parser.parse_args()
+    rules = DEFAULT_RULES
+    if args.rules:
+        with open(args.rules) as f:
+            rules = json.load(f)
+    benchmark(load_corpus(args.corpus), rules, args.repeat, only=args.only)
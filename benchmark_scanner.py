@@ -0,0 +1,81 @@
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from NetworkScanner import discover, expand_network, incremental_scan
+from SimulatedNetwork import SimulatedTransport
+
+NETWORKS = {"/24": "10.0.0.0/24", "/20": "10.0.0.0/20", "/16": "10.0.0.0/16"}
+MODES = ("icmp", "tcp", "auto", "incremental")
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+def run_once(network, mode, args, state_path, trace=False):
+    # Treat the first /24 as on-link so "auto" exercises ARP as well as ICMP and TCP
+    transport = SimulatedTransport(alive=args.alive, icmp_blocked=args.icmp_blocked, latency_ms=args.latency,
+                                   loss=args.loss, on_link="10.0.0.0/24", time_scale=args.time_scale)
+    options = {"rate": args.rate, "concurrency": args.concurrency, "timeout": args.timeout, "transport": transport}
+
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "incremental":
+        # Scored on the rescan: the first pass only seeds the state file
+        with contextlib.redirect_stdout(io.StringIO()):
+            incremental_scan(network, state_path=state_path, method="auto", **options)
+            transport.first_reply = None
+            start = time.perf_counter()
+            incremental_scan(network, state_path=state_path, method="auto", **options)
+    else:
+        for _ in discover(network, method=mode, **options):
+            pass
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    first = (transport.first_reply - start) if transport.first_reply else elapsed
+    return elapsed, first, peak
+
+def benchmark(args):
+    print(f"{'network':8} {'mode':12} {'hosts/sec':>12} {'ttfr p50':>10} {'ttfr p99':>10} {'peak mem':>10}")
+    for size in args.sizes:
+        network = NETWORKS[size]
+        host_count = len(expand_network(network))
+        for mode in args.modes:
+            timings, firsts = [], []
+            for _ in range(args.repeat):
+                with tempfile.TemporaryDirectory() as tmp:
+                    elapsed, first, _ = run_once(network, mode, args, os.path.join(tmp, "state.db"))
+                timings.append(elapsed)
+                firsts.append(first)
+            # Memory is measured on a separate run because tracing skews the timings
+            with tempfile.TemporaryDirectory() as tmp:
+                _, _, peak = run_once(network, mode, args, os.path.join(tmp, "state.db"), trace=True)
+            rate = host_count / statistics.median(timings)
+            print(f"{size:8} {mode:12} {rate:12.0f} {percentile(firsts, 50) * 1000:8.1f}ms "
+                  f"{percentile(firsts, 99) * 1000:8.1f}ms {peak / 2 ** 20:8.1f}MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark scan modes against a simulated network")
+    parser.add_argument("--sizes", nargs="+", choices=list(NETWORKS), default=list(NETWORKS))
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per network/mode pair")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=None)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--alive", type=float, default=0.3, help="Fraction of simulated hosts that are up")
+    parser.add_argument("--icmp-blocked", type=float, default=0.2, help="Fraction of live hosts that drop ICMP")
+    parser.add_argument("--latency", type=float, default=2.0, help="Median simulated RTT in ms")
+    parser.add_argument("--loss", type=float, default=0.01, help="Simulated per-packet loss probability")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="Factor applied to simulated waits")
+
+    benchmark(parser.parse_args())
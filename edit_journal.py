@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+def _user_state_dir():
+    if os.name == "nt":
+        return os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Application Support")
+    return os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+
+# Per user rather than per working directory, so recovery finds journals wherever the editor is started
+RECOVERY_DIR = os.path.join(_user_state_dir(), "python-others", "recovery")
+# Rewrite the journal as one snapshot once this many bytes of edits have piled up
+COMPACT_BYTES = 4 * 2 ** 20
+
+def journal_path(editor, document=None, directory=RECOVERY_DIR):
+    """
+    Journal file for a document, or for an untitled buffer when document is None.
+    """
+    # The pid keeps two editors open on the same file from replacing or deleting each other's journal
+    key = f"{os.path.abspath(document) if document else 'untitled'}-{os.getpid()}"
+    return os.path.join(directory, f"{editor}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.jsonl")
+
+def _process_running(pid):
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class EditJournal:
+    """
+    Append-only autosave journal for one open document.
+
+    The first line is a base record: either the document file as it was on
+    disk (path, size and mtime) or a full snapshot. Every later line is one
+    JSON edit record appended by the editor. Records are buffered and written
+    by flush(), so autosave I/O is proportional to the edits made, not to the
+    document size. Once COMPACT_BYTES of edits have been written, checkpoint()
+    replaces the file with a single snapshot of the current document.
+
+    What an edit or snapshot record holds is up to the editor; the journal
+    only stores and replays them in order.
+
+    Args:
+        path (str): Journal file, usually from journal_path(). Raises OSError
+            if it cannot be created.
+        editor (str): Name of the editor that owns the journal, checked on recovery.
+        document (str): File the buffer was loaded from or last saved to.
+        snapshot (dict): Full document state to start from, instead of the document file.
+    """
+
+    def __init__(self, path, editor, document=None, snapshot=None, compact_bytes=COMPACT_BYTES):
+        self.path = path
+        self.editor = editor
+        self.document = document
+        self.compact_bytes = compact_bytes
+        self.pending = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._write_base(snapshot)
+
+    def _base_record(self, snapshot):
+        base = {"op": "base", "editor": self.editor, "document": self.document, "pid": os.getpid(), "time": time.time()}
+        if snapshot is not None:
+            base["snapshot"] = snapshot
+        elif self.document:
+            stat = os.stat(self.document)
+            base["size"] = stat.st_size
+            base["mtime"] = stat.st_mtime
+        return base
+
+    def _write_base(self, snapshot):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self._base_record(snapshot)) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.written = 0
+
+    def append(self, record):
+        self.pending.append(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def flush(self):
+        if not self.pending:
+            return
+        data = "".join(self.pending)
+        self.pending = []
+        self.file.write(data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.written += len(data)
+
+    def needs_checkpoint(self):
+        return self.written >= self.compact_bytes
+
+    def checkpoint(self, snapshot):
+        """
+        Replaces every record so far with one snapshot of the document.
+        """
+        self.pending = []
+        self.file.close()
+        self._write_base(snapshot)
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def discard(self):
+        """
+        Removes the journal, for when the document was saved or closed on purpose.
+        """
+        self.pending = []
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def read_journal(path):
+    """
+    Returns (base record, list of edit records). A last line cut short by a
+    crash is ignored.
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        base = json.loads(f.readline())
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return base, records
+
+def find_recoverable(editor, directory=RECOVERY_DIR):
+    """
+    Journals left by instances of `editor` that are no longer running, newest first.
+
+    Returns:
+        list: (path, base record) pairs.
+    """
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        if not (name.startswith(editor + "-") and name.endswith(".jsonl")):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                base = json.loads(f.readline())
+        except (OSError, ValueError):
+            continue
+        # Journals of running editors, this one included, are still in use
+        pid = base.get("pid", 0)
+        if base.get("editor") != editor or pid == os.getpid() or _process_running(pid):
+            continue
+        found.append((path, base))
+    found.sort(key=lambda item: item[1].get("time", 0), reverse=True)
+    return found
+
+def base_unchanged(base):
+    """
+    Whether the document file a base record refers to is still as it was when
+    the journal was started. Untitled documents never change.
+    """
+    document = base.get("document")
+    if not document:
+        return True
+    if not os.path.exists(document):
+        return False
+    stat = os.stat(document)
+    return stat.st_size == base.get("size") and stat.st_mtime == base.get("mtime")
+
+def base_text(base):
+    """
+    Text of the document file a base record refers to, or None if the file has
+    changed since the journal was started.
+    """
+    if not base_unchanged(base):
+        return None
+    if not base.get("document"):
+        return ""
+    with open(base["document"], "r") as f:
+        return f.read()
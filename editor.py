@@ -1,9 +1,204 @@
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTextEdit, QAction, QFileDialog, QColorDialog, QFontDialog, QToolBar, QComboBox, QVBoxLayout, QWidget, QMessageBox, QInputDialog, QMenu
-from PyQt5.QtGui import QIcon, QFont, QTextCursor, QTextListFormat, QTextTableFormat, QImage, QTextDocument, QTextCharFormat, QTextDocumentFragment, QCursor
-from PyQt5.QtCore import Qt, QUrl
+from PyQt5.QtWidgets import QApplication, QMainWindow, QTextEdit, QAction, QFileDialog, QColorDialog, QFontDialog, QToolBar, QComboBox, QVBoxLayout, QWidget, QMessageBox, QInputDialog, QMenu, QActionGroup
+from PyQt5.QtGui import QIcon, QFont, QTextCursor, QTextListFormat, QTextTableFormat, QImage, QTextDocument, QTextCharFormat, QTextDocumentFragment, QCursor, QTextFormat, QTextBlockFormat, QColor, QSyntaxHighlighter
+from PyQt5.QtCore import Qt, QUrl, QPoint, QTimer, QBuffer, QIODevice, QSizeF
 from PyQt5.QtGui import QDesktopServices  # Import QDesktopServices
 
+import os
+import shutil
 import sys
+import time
+from bisect import bisect_left
+
+from edit_journal import EditJournal, base_text, base_unchanged, find_recoverable, journal_path, read_journal
+from large_file import LineIndex, WINDOW_LINES, is_large_file
+import rich_format
+from rich_format import RichDocument
+from syntax_highlight import LANGUAGES, THEME, language_for_path
+
+AUTOSAVE_INTERVAL_MS = 1000
+# Object replacement character: images and other embedded objects
+OBJECT_CHAR = "\ufffc"
+FILE_FILTER = f'Rich Documents (*{rich_format.EXTENSION});;Text Files (*.txt);;All Files (*)'
+
+def char_style(fmt):
+    # Only what is set explicitly is kept, so unformatted text shares one small style
+    style = {}
+    if fmt.hasProperty(QTextFormat.FontFamily):
+        style["family"] = fmt.fontFamily()
+    if fmt.hasProperty(QTextFormat.FontPointSize):
+        style["size"] = fmt.fontPointSize()
+    if fmt.hasProperty(QTextFormat.FontWeight):
+        style["weight"] = fmt.fontWeight()
+    if fmt.fontItalic():
+        style["italic"] = True
+    if fmt.fontUnderline():
+        style["underline"] = True
+    if fmt.hasProperty(QTextFormat.ForegroundBrush):
+        style["color"] = fmt.foreground().color().name()
+    if fmt.isAnchor():
+        style["href"] = fmt.anchorHref()
+    return style
+
+def char_format(style):
+    fmt = QTextCharFormat()
+    if "family" in style:
+        fmt.setFontFamily(style["family"])
+    if "size" in style:
+        fmt.setFontPointSize(style["size"])
+    if "weight" in style:
+        fmt.setFontWeight(style["weight"])
+    if style.get("italic"):
+        fmt.setFontItalic(True)
+    if style.get("underline"):
+        fmt.setFontUnderline(True)
+    if "color" in style:
+        fmt.setForeground(QColor(style["color"]))
+    if "href" in style:
+        fmt.setAnchor(True)
+        fmt.setAnchorHref(style["href"])
+    return fmt
+
+def block_style(block):
+    style = {}
+    if block.blockFormat().hasProperty(QTextFormat.BlockAlignment):
+        style["align"] = int(block.blockFormat().alignment())
+    if block.textList():
+        style["list"] = block.textList().format().style()
+    return style
+
+class QtSyntaxHighlighter(QSyntaxHighlighter):
+    """
+    Colours a document with one of syntax_highlight's languages.
+
+    Each block keeps the lexer state left at its end. After an edit Qt re-runs
+    highlightBlock on the changed blocks only, and carries on to the next block
+    only while the state at the end of a block differs from what it was. So
+    typing inside a line costs one line, whatever the document size.
+    Highlighting formats are layout-only: they are not part of the document,
+    its HTML, or the autosave journal.
+    """
+
+    def __init__(self, document, language=None):
+        super().__init__(document)
+        self.language = language
+        self.formats = {}
+        for kind, style in THEME.items():
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(style["color"]))
+            if "background" in style:
+                fmt.setBackground(QColor(style["background"]))
+            if style.get("bold"):
+                fmt.setFontWeight(QFont.Bold)
+            if style.get("italic"):
+                fmt.setFontItalic(True)
+            self.formats[kind] = fmt
+
+    def set_language(self, language):
+        if language is self.language:
+            return
+        self.language = language
+        document = self.document()
+        # Re-colouring block by block makes QTextEdit lay out the rest of the document after
+        # every block. QTextDocumentLayout skips layout while the page size is null, so the
+        # document is laid out once, when the size is restored. Nothing in it is edited.
+        page_size = document.pageSize()
+        document.setPageSize(QSizeF(0, 0))
+        try:
+            self.rehighlight()
+        finally:
+            document.setPageSize(page_size)
+
+    def highlightBlock(self, text):
+        if self.language is None:
+            return
+        spans, state = self.language.lex(text, max(self.previousBlockState(), 0))
+        wide = [] if text.isascii() else [i for i, char in enumerate(text) if ord(char) > 0xFFFF]
+        for start, length, kind in spans:
+            if wide:
+                # Qt counts UTF-16 code units, so characters outside the BMP take two positions
+                end = start + length
+                start += bisect_left(wide, start)
+                length = end + bisect_left(wide, end) - start
+            self.setFormat(start, length, self.formats[kind])
+        self.setCurrentBlockState(state)
+
+class QtLargeFileView:
+    """
+    Shows a LineIndex in a QTextEdit one window of lines at a time.
+
+    The Qt counterpart of large_file.LargeFileView: when the scroll bar gets
+    close to either end of the window, the window is re-centred on the first
+    visible line. The editor is read-only while the view is open.
+    """
+
+    def __init__(self, editor, index, window=WINDOW_LINES):
+        self.editor = editor
+        self.index = index
+        self.window = window
+        self.top = 0
+        self.paging = False
+        self.recentre_pending = False
+        self.editor.setReadOnly(True)
+        self.scrollbar = editor.verticalScrollBar()
+        self.scrollbar.valueChanged.connect(self._on_scroll)
+        self._load(0)
+        # Until the index is done, refill the window whenever it has grown past what is shown
+        self.timer = QTimer()
+        self.timer.timeout.connect(self._wait_for_index)
+        self.timer.start(100)
+
+    def _wait_for_index(self):
+        if self.index.complete.is_set() or len(self.index.offsets) > self.top + self.window:
+            self._load(self.first_visible_line())
+        if self.index.complete.is_set() or len(self.index.offsets) > self.top + self.window:
+            self.timer.stop()
+
+    def first_visible_line(self):
+        # 0-based line number in the file of the line at the top of the viewport
+        return self.top + self.editor.cursorForPosition(QPoint(0, 0)).blockNumber()
+
+    def _load(self, line):
+        top, text = self.index.window(line, self.window)
+        self.paging = True
+        try:
+            self.editor.setPlainText(text)
+            self.top = top
+            document = self.editor.document()
+            block = document.findBlockByNumber(line - top)
+            self.scrollbar.setValue(int(document.documentLayout().blockBoundingRect(block).top()))
+        finally:
+            self.paging = False
+
+    def _on_scroll(self, value):
+        maximum = self.scrollbar.maximum()
+        if self.paging or not maximum:
+            return
+        near_top = value < 0.1 * maximum and self.top > 0
+        near_bottom = value > 0.9 * maximum and self.top + self.window < self.index.line_count
+        if (near_top or near_bottom) and not self.recentre_pending:
+            self.recentre_pending = True
+            QTimer.singleShot(0, self._recentre)
+
+    def _recentre(self):
+        self.recentre_pending = False
+        self._load(self.first_visible_line())
+
+    def goto_line(self, line):
+        """
+        Scrolls to a 1-based line of the file and puts the cursor on it.
+        """
+        line = max(0, min(line - 1, self.index.line_count - 1))
+        if not self.top <= line < self.top + self.window:
+            self._load(line)
+        cursor = QTextCursor(self.editor.document().findBlockByNumber(line - self.top))
+        self.editor.setTextCursor(cursor)
+        self.editor.ensureCursorVisible()
+
+    def close(self):
+        self.timer.stop()
+        self.scrollbar.valueChanged.disconnect(self._on_scroll)
+        self.editor.setReadOnly(False)
+        self.index.close()
 
 class AdvancedTextEditor(QMainWindow):
     def __init__(self):
@@ -12,13 +207,29 @@ class AdvancedTextEditor(QMainWindow):
         self.editor = QTextEdit(self)
         self.setCentralWidget(self.editor)
 
+        # Syntax colouring follows the file extension, or the View > Syntax menu
+        self.highlighter = QtSyntaxHighlighter(self.editor.document())
+
+        # Large files are shown read-only, a window of lines at a time
+        self.large_file = None
+
+        # Every document change is appended to an autosave journal, replayed after a crash
+        self.file_path = None
+        self.edit_journal = None
+        self.editor.document().contentsChange.connect(self.journal_change)
+        self.start_journal()
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.autosave_timer.start(AUTOSAVE_INTERVAL_MS)
+        QTimer.singleShot(0, self.offer_recovery)
+
         self.init_ui()
 
     def init_ui(self):
         self.create_toolbar()
         self.create_menu()
 
-        self.setWindowTitle('Advanced Text Editor')
+        # The window title is set by start_journal, which notes when autosave is off
         self.setGeometry(100, 100, 800, 600)
 
     def create_toolbar(self):
@@ -124,7 +335,26 @@ class AdvancedTextEditor(QMainWindow):
         file_menu.addAction(save_action)
 
         # Edit menu
-        # edit_menu = menubar.addMenu('Edit')
+        edit_menu = menubar.addMenu('Edit')
+
+        # Go to line action
+        goto_action = QAction('Go to Line', self)
+        goto_action.setShortcut('Ctrl+G')
+        goto_action.triggered.connect(self.goto_line)
+        edit_menu.addAction(goto_action)
+
+        # Syntax menu: one checkable action per language
+        view_menu = menubar.addMenu('View')
+        syntax_menu = view_menu.addMenu('Syntax')
+        syntax_group = QActionGroup(self)
+        self.syntax_actions = {}
+        for name in [None] + list(LANGUAGES):
+            action = QAction(name or 'Plain Text', self, checkable=True)
+            action.triggered.connect(lambda checked, name=name: self.set_language(LANGUAGES.get(name)))
+            syntax_group.addAction(action)
+            syntax_menu.addAction(action)
+            self.syntax_actions[name] = action
+        self.syntax_actions[None].setChecked(True)
 
         # Context menu for hyperlinks
         # self.editor.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -230,20 +460,273 @@ class AdvancedTextEditor(QMainWindow):
             if QUrl(url).isValid():
                 QDesktopServices.openUrl(QUrl(url))
 
+    def close_large_file(self):
+        if self.large_file:
+            self.large_file.close()
+            self.large_file = None
+
+    def set_language(self, language):
+        self.highlighter.set_language(language)
+        self.syntax_actions[language.name if language else None].setChecked(True)
+
     def new_file(self):
+        self.close_large_file()
+        self.stop_journal()
         self.editor.clear()
+        self.set_language(None)
+        self.file_path = None
+        self.start_journal()
 
     def open_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, 'Open File', '', 'Text Files (*.txt);;All Files (*)')
+        file_path, _ = QFileDialog.getOpenFileName(self, 'Open File', '', FILE_FILTER)
         if file_path:
+            if file_path.endswith(rich_format.EXTENSION):
+                # The current document and its journal are only replaced once the load has succeeded
+                self.wait_for_io(rich_format.load_async(file_path), lambda document: self.opened_rich_document(file_path, document))
+                return
+            self.close_large_file()
+            # Loading is not journaled: the journal starts from the file as it is on disk
+            self.stop_journal()
+            # Cleared first, so switching language does not re-colour the old text
+            self.editor.clear()
+            self.set_language(language_for_path(file_path))
+            if is_large_file(file_path):
+                self.large_file = QtLargeFileView(self.editor, LineIndex(file_path))
+                return
             with open(file_path, 'r') as file:
                 self.editor.setText(file.read())
+            self.file_path = file_path
+            self.start_journal()
+
+    def goto_line(self):
+        line, ok = QInputDialog.getInt(self, 'Go to Line', 'Line number:', 1, 1)
+        if not ok:
+            return
+        if self.large_file:
+            self.large_file.goto_line(line)
+        else:
+            cursor = QTextCursor(self.editor.document().findBlockByNumber(line - 1))
+            self.editor.setTextCursor(cursor)
+            self.editor.ensureCursorVisible()
 
     def save_file(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, 'Save File', '', 'Text Files (*.txt);;All Files (*)')
-        if file_path:
+        file_path, _ = QFileDialog.getSaveFileName(self, 'Save File', '', FILE_FILTER)
+        if file_path and self.large_file:
+            # The editor only holds a window of the file, and the file cannot have changed
+            shutil.copyfile(self.large_file.index.path, file_path)
+        elif file_path.endswith(rich_format.EXTENSION):
+            self.save_rich_document(file_path)
+        elif file_path:
             with open(file_path, 'w') as file:
                 file.write(self.editor.toPlainText())
+            # The journal restarts from a snapshot, which keeps the formatting the text file does not
+            self.file_path = file_path
+            self.start_journal(self.snapshot())
+
+    def _image_bytes(self, name):
+        image = self.editor.document().resource(QTextDocument.ImageResource, QUrl(name))
+        if not isinstance(image, QImage):
+            image = QImage(name)
+        buffer = QBuffer()
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, 'PNG')
+        return bytes(buffer.data())
+
+    def to_rich_document(self):
+        """
+        Walks the document once, fragment by fragment (runs of one format), not character by character.
+        Tables are kept as their cell text only.
+        """
+        document = RichDocument()
+        pieces = []
+        offset = 0
+        block = self.editor.document().begin()
+        while block.isValid():
+            if offset or pieces:
+                pieces.append("\n")
+                document.add_run(1, document.style_id({}))
+                offset += 1
+            iterator = block.begin()
+            while not iterator.atEnd():
+                fragment = iterator.fragment()
+                fmt = fragment.charFormat()
+                if fmt.isImageFormat():
+                    data = self._image_bytes(fmt.toImageFormat().name())
+                    for _ in fragment.text():
+                        document.add_image(offset, data)
+                else:
+                    text = fragment.text()
+                    pieces.append(text)
+                    document.add_run(len(text), document.style_id(char_style(fmt)))
+                    offset += len(text)
+                iterator += 1
+            document.add_block_run(1, document.style_id(block_style(block)))
+            block = block.next()
+        document.text = "".join(pieces)
+        return document
+
+    def load_rich_document(self, document):
+        """
+        Rebuilds the document with one insertText call per style run and one
+        block format call per formatted paragraph.
+        """
+        qdocument = self.editor.document()
+        qdocument.clear()
+        cursor = QTextCursor(qdocument)
+        cursor.beginEditBlock()
+        for text, style in document.iter_runs():
+            cursor.insertText(text, char_format(style))
+        block = qdocument.begin()
+        text_list = None
+        for count, style in document.iter_block_runs():
+            for _ in range(count):
+                if "align" in style:
+                    fmt = QTextBlockFormat()
+                    fmt.setAlignment(Qt.Alignment(style["align"]))
+                    QTextCursor(block).mergeBlockFormat(fmt)
+                if "list" not in style:
+                    text_list = None
+                elif text_list is not None and text_list.format().style() == style["list"]:
+                    text_list.add(block)
+                else:
+                    text_list = QTextCursor(block).createList(style["list"])
+                block = block.next()
+        # Images go in last one first, so the offsets of the ones before stay valid
+        for offset, digest in reversed(document.images):
+            name = "rdoc-image:" + digest
+            qdocument.addResource(QTextDocument.ImageResource, QUrl(name), QImage.fromData(document.blobs[digest]))
+            cursor.setPosition(offset)
+            cursor.insertImage(name)
+        cursor.endEditBlock()
+
+    def wait_for_io(self, future, on_done):
+        # Rich saves and loads run on rich_format's I/O thread; results are picked up here
+        if not future.done():
+            QTimer.singleShot(20, lambda: self.wait_for_io(future, on_done))
+            return
+        try:
+            result = future.result()
+        except (OSError, ValueError) as e:
+            # A failed save leaves the editor writable again; a failed load leaves a large-file view read-only
+            if self.large_file is None:
+                self.editor.setReadOnly(False)
+            QMessageBox.warning(self, 'Error', str(e))
+            return
+        on_done(result)
+
+    def opened_rich_document(self, file_path, document):
+        self.close_large_file()
+        self.stop_journal()
+        self.set_language(None)
+        self.load_rich_document(document)
+        self.file_path = file_path
+        self.start_journal()
+
+    def save_rich_document(self, file_path):
+        document = self.to_rich_document()
+        # Read-only until the file is written, so no edit falls between the save and the new journal
+        self.editor.setReadOnly(True)
+        self.wait_for_io(rich_format.save_async(file_path, document), lambda result: self.saved_rich_document(file_path))
+
+    def saved_rich_document(self, file_path):
+        self.editor.setReadOnly(False)
+        self.file_path = file_path
+        self.start_journal()
+
+    def start_journal(self, snapshot=None):
+        self.stop_journal()
+        try:
+            self.edit_journal = EditJournal(journal_path("editor", self.file_path), "editor", self.file_path, snapshot)
+        except OSError:
+            # The editor still works without a writable recovery directory, only without autosave
+            self.edit_journal = None
+        self.setWindowTitle('Advanced Text Editor' if self.edit_journal else 'Advanced Text Editor (autosave off)')
+
+    def stop_journal(self):
+        if self.edit_journal:
+            self.edit_journal.discard()
+            self.edit_journal = None
+
+    def snapshot(self):
+        return {"html": self.editor.toHtml()}
+
+    def journal_change(self, position, removed, added):
+        if not self.edit_journal or self.large_file:
+            return
+        if removed and removed == added:
+            # Same length at the same place: a formatting change, recorded with its formatting
+            self.edit_journal.append({"op": "format", "at": position, "count": added, "html": self._fragment_html(position, added)})
+            return
+        if removed:
+            self.edit_journal.append({"op": "delete", "at": position, "count": removed})
+        if added == 1 and self.editor.document().characterAt(position) != OBJECT_CHAR:
+            # Typing: the character takes the format of its neighbour on replay, as it did here
+            char = self.editor.document().characterAt(position).replace("\u2029", "\n")
+            self.edit_journal.append({"op": "insert", "at": position, "text": char})
+        elif added:
+            self.edit_journal.append({"op": "insert", "at": position, "html": self._fragment_html(position, added)})
+
+    def _fragment_html(self, position, count):
+        document = self.editor.document()
+        cursor = QTextCursor(document)
+        cursor.setPosition(position)
+        # Changes can count the document's closing paragraph separator, which a cursor cannot select
+        cursor.setPosition(min(position + count, document.characterCount() - 1), QTextCursor.KeepAnchor)
+        return QTextDocumentFragment(cursor).toHtml()
+
+    def apply_record(self, record):
+        document = self.editor.document()
+        cursor = QTextCursor(document)
+        cursor.setPosition(min(record["at"], document.characterCount() - 1))
+        if record["op"] in ("delete", "format"):
+            cursor.setPosition(min(record["at"] + record["count"], document.characterCount() - 1), QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+        if "html" in record:
+            cursor.insertFragment(QTextDocumentFragment.fromHtml(record["html"]))
+        elif record["op"] == "insert":
+            cursor.insertText(record["text"])
+
+    def autosave(self):
+        if self.edit_journal:
+            self.edit_journal.flush()
+            if self.edit_journal.needs_checkpoint():
+                self.edit_journal.checkpoint(self.snapshot())
+
+    def offer_recovery(self):
+        for path, base in find_recoverable("editor"):
+            base, records = read_journal(path)
+            if records or "snapshot" in base:
+                break
+            os.remove(path)
+        else:
+            return
+        name = base.get("document") or "an untitled document"
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(base.get("time", 0)))
+        answer = QMessageBox.question(self, 'Recover Unsaved Changes', f'Unsaved changes to {name} from {when} were found. Recover them?')
+        if answer != QMessageBox.Yes:
+            os.remove(path)
+            return
+        if "snapshot" not in base and not base_unchanged(base):
+            QMessageBox.warning(self, 'Recover Unsaved Changes', f'{name} has changed since the changes were made; they cannot be replayed.')
+            os.remove(path)
+            return
+        self.stop_journal()
+        if "snapshot" in base:
+            self.editor.setHtml(base["snapshot"]["html"])
+        elif (base.get("document") or "").endswith(rich_format.EXTENSION):
+            self.load_rich_document(rich_format.load(base["document"]))
+        else:
+            self.editor.setText(base_text(base))
+        for record in records:
+            self.apply_record(record)
+        os.remove(path)
+        self.file_path = base.get("document")
+        self.start_journal(self.snapshot())
+
+    def closeEvent(self, event):
+        self.close_large_file()
+        self.stop_journal()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
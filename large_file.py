@@ -0,0 +1,166 @@
+import mmap
+import os
+import threading
+from array import array
+
+# Files at least this big open read-only in large-file mode instead of being read whole
+LARGE_FILE_THRESHOLD = 32 * 2 ** 20
+# Lines kept in the text widget at a time
+WINDOW_LINES = 5000
+
+def is_large_file(path, threshold=LARGE_FILE_THRESHOLD):
+    return os.path.getsize(path) >= threshold
+
+class LineIndex:
+    """
+    Line-start offsets of a memory-mapped file, built on a background thread.
+
+    Nothing but the index (8 bytes per line) is held in memory; line text is
+    decoded from the mapping on demand. Lines that are already indexed can be
+    read while the rest of the file is still being scanned.
+    """
+
+    def __init__(self, path, encoding="utf-8"):
+        self.path = path
+        self.encoding = encoding
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        # mmap cannot map an empty file
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.offsets = array("Q", [0])
+        self.complete = threading.Event()
+        self.closed = False
+        self.builder = threading.Thread(target=self._build, daemon=True)
+        self.builder.start()
+
+    def _build(self):
+        offsets = self.offsets
+        find = self.map.find
+        newline = find(b"\n")
+        while newline >= 0 and not self.closed:
+            offsets.append(newline + 1)
+            newline = find(b"\n", newline + 1)
+        self.complete.set()
+
+    @property
+    def line_count(self):
+        count = len(self.offsets)
+        # A trailing newline does not start another line
+        if self.complete.is_set() and count > 1 and self.offsets[-1] == self.size:
+            count -= 1
+        return count
+
+    def lines(self, first, count):
+        """
+        Returns the text of lines [first, first + count) (0-based) that are indexed so far.
+        """
+        available = len(self.offsets)
+        first = min(first, available - 1)
+        start = self.offsets[first]
+        if first + count < available:
+            end = self.offsets[first + count]
+        elif self.complete.is_set():
+            end = self.size
+        else:
+            end = self.offsets[-1]
+        text = self.map[start:end].decode(self.encoding, errors="replace")
+        return text[:-1] if text.endswith("\n") else text
+
+    def window(self, line, size=WINDOW_LINES):
+        """
+        Picks the window of `size` lines centred on `line`.
+
+        Returns:
+            tuple: (first line of the window, its text).
+        """
+        top = max(0, min(line - size // 2, self.line_count - size))
+        return top, self.lines(top, size)
+
+    def close(self):
+        self.closed = True
+        self.builder.join()
+        if self.size:
+            self.map.close()
+        self.file.close()
+
+class LargeFileView:
+    """
+    Shows a LineIndex in a tk.Text widget one window of lines at a time.
+
+    The widget holds WINDOW_LINES lines. When scrolling gets close to either
+    edge of the window, the window is re-centred on the first visible line, so
+    scrolling pages through the whole file. goto_line jumps anywhere in it.
+    The widget is read-only while the view is open.
+
+    Args:
+        on_page (callable): Called with the view after each window change.
+    """
+
+    def __init__(self, text_area, index, window=WINDOW_LINES, on_page=None):
+        self.text_area = text_area
+        self.index = index
+        self.window = window
+        self.on_page = on_page
+        self.top = 0
+        self.paging = False
+        self.recentre_pending = False
+        self.scroll_command = str(text_area.cget("yscrollcommand"))
+        text_area.configure(yscrollcommand=self._on_scroll)
+        self._load(0)
+        self._wait_for_index()
+
+    def _wait_for_index(self):
+        # Until the index is done, refill the window whenever it has grown past what is shown
+        if self.index.complete.is_set() or len(self.index.offsets) > self.top + self.window:
+            self._load(self.first_visible_line())
+        if not self.index.complete.is_set() and len(self.index.offsets) <= self.top + self.window:
+            self.text_area.after(100, self._wait_for_index)
+
+    def first_visible_line(self):
+        # 0-based line number in the file of the line at the top of the widget
+        return self.top + int(self.text_area.index("@0,0").split(".")[0]) - 1
+
+    def _load(self, line):
+        top, text = self.index.window(line, self.window)
+        self.paging = True
+        try:
+            self.text_area.configure(state="normal")
+            self.text_area.delete("1.0", "end")
+            self.text_area.insert("1.0", text)
+            self.text_area.configure(state="disabled")
+            self.top = top
+            self.text_area.yview(f"{line - top + 1}.0")
+        finally:
+            self.paging = False
+        if self.on_page is not None:
+            self.on_page(self)
+
+    def _on_scroll(self, first, last):
+        if self.scroll_command:
+            self.text_area.tk.eval(f"{self.scroll_command} {first} {last}")
+        if self.paging:
+            return
+        near_top = float(first) < 0.1 and self.top > 0
+        near_bottom = float(last) > 0.9 and self.top + self.window < self.index.line_count
+        if (near_top or near_bottom) and not self.recentre_pending:
+            # Re-centring happens after the current scroll has been drawn
+            self.recentre_pending = True
+            self.text_area.after_idle(self._recentre)
+
+    def _recentre(self):
+        self.recentre_pending = False
+        self._load(self.first_visible_line())
+
+    def goto_line(self, line):
+        """
+        Scrolls to a 1-based line of the file and puts the cursor on it.
+        """
+        line = max(0, min(line - 1, self.index.line_count - 1))
+        if not self.top <= line < self.top + self.window:
+            self._load(line)
+        self.text_area.mark_set("insert", f"{line - self.top + 1}.0")
+        self.text_area.see("insert")
+
+    def close(self):
+        self.text_area.configure(yscrollcommand=self.scroll_command, state="normal")
+        self.index.close()
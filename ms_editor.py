@@ -1,5 +1,13 @@
+import os
+import shutil
+import time
 import tkinter as tk
-from tkinter import filedialog
+from tkinter import filedialog, messagebox, simpledialog
+from edit_journal import EditJournal, base_text, base_unchanged, find_recoverable, journal_path, read_journal
+from large_file import LineIndex, LargeFileView, is_large_file
+from text_hooks import TextChangeHook
+
+AUTOSAVE_INTERVAL_MS = 1000
 
 class TextEditor:
     def __init__(self, root):
@@ -13,24 +21,141 @@ class TextEditor:
         self.file_menu.add_command(label="New", command=self.new_file)
         self.file_menu.add_command(label="Open", command=self.open_file)
         self.file_menu.add_command(label="Save", command=self.save_file)
-        self.file_menu.add_command(label="Exit", command=self.root.quit)
+        self.file_menu.add_command(label="Exit", command=self.exit)
         self.menu_bar.add_cascade(label="File", menu=self.file_menu)
+        self.edit_menu = tk.Menu(self.menu_bar, tearoff=0)
+        self.edit_menu.add_command(label="Go to Line", command=self.goto_line)
+        self.menu_bar.add_cascade(label="Edit", menu=self.edit_menu)
         self.root.config(menu=self.menu_bar)
+        self.root.bind("<Control-g>", self.goto_line)
+
+        # Large files are shown read-only, a window of lines at a time
+        self.large_file = None
+
+        # Every edit is appended to an autosave journal, replayed after a crash
+        self.file_path = None
+        self.edit_journal = None
+        self.text_hook = TextChangeHook(self.text_area)
+        self.text_hook.add_listener(self.journal_edit)
+        self.start_journal()
+        self.root.after(AUTOSAVE_INTERVAL_MS, self.autosave)
+        self.root.after_idle(self.offer_recovery)
+        self.root.protocol("WM_DELETE_WINDOW", self.exit)
+
+    def close_large_file(self):
+        if self.large_file:
+            self.large_file.close()
+            self.large_file = None
+            self.text_area.delete(1.0, tk.END)
+            self.start_journal()
 
     def new_file(self):
+        self.close_large_file()
+        self.stop_journal()
         self.text_area.delete(1.0, tk.END)
+        self.file_path = None
+        self.start_journal()
 
     def open_file(self):
         file_path = filedialog.askopenfilename(defaultextension=".txt")
         if file_path:
+            # A large file being shown is replaced, not inserted into
+            self.close_large_file()
+            # Loading is not journaled: the journal starts from the file as it is on disk
+            self.stop_journal()
+            if is_large_file(file_path):
+                # The file cannot be edited in this mode, so there is nothing to journal
+                self.large_file = LargeFileView(self.text_area, LineIndex(file_path))
+                return
             with open(file_path, "r") as file:
-                self.text_area.insert(tk.INSERT, file.read())
+                self.text_area.delete(1.0, tk.END)
+                self.text_area.insert("1.0", file.read())
+            self.file_path = file_path
+            self.start_journal()
+
+    def goto_line(self, event=None):
+        line = simpledialog.askinteger("Go to Line", "Line number:", parent=self.root, minvalue=1)
+        if line is None:
+            return
+        if self.large_file:
+            self.large_file.goto_line(line)
+        else:
+            self.text_area.mark_set(tk.INSERT, f"{line}.0")
+            self.text_area.see(tk.INSERT)
 
     def save_file(self):
         file_path = filedialog.asksaveasfilename(defaultextension=".txt")
-        if file_path:
+        if file_path and self.large_file:
+            shutil.copyfile(self.large_file.index.path, file_path)
+        elif file_path:
             with open(file_path, "w") as file:
                 file.write(self.text_area.get(1.0, tk.END))
+            # Edits made before the save need no replaying
+            self.file_path = file_path
+            self.start_journal(self.text_area.get("1.0", "end-1c"))
+
+    def start_journal(self, snapshot=None):
+        self.stop_journal()
+        try:
+            self.edit_journal = EditJournal(journal_path("ms_editor", self.file_path), "ms_editor", self.file_path, snapshot)
+        except OSError:
+            # The editor still works without a writable recovery directory, only without autosave
+            self.edit_journal = None
+        self.root.title("Simple Text Editor" if self.edit_journal else "Simple Text Editor (autosave off)")
+
+    def stop_journal(self):
+        if self.edit_journal:
+            self.edit_journal.discard()
+            self.edit_journal = None
+
+    def journal_edit(self, edit):
+        if not self.edit_journal:
+            return
+        if edit.kind == "insert":
+            self.edit_journal.append({"op": "insert", "at": edit.start, "text": edit.text})
+        else:
+            self.edit_journal.append({"op": "delete", "start": edit.start, "end": edit.end})
+
+    def autosave(self):
+        if self.edit_journal:
+            self.edit_journal.flush()
+            if self.edit_journal.needs_checkpoint():
+                self.edit_journal.checkpoint(self.text_area.get("1.0", "end-1c"))
+        self.root.after(AUTOSAVE_INTERVAL_MS, self.autosave)
+
+    def offer_recovery(self):
+        for path, base in find_recoverable("ms_editor"):
+            base, records = read_journal(path)
+            if records or base.get("snapshot"):
+                break
+            os.remove(path)
+        else:
+            return
+        name = base.get("document") or "an untitled document"
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(base.get("time", 0)))
+        if not messagebox.askyesno("Recover Unsaved Changes", f"Unsaved changes to {name} from {when} were found. Recover them?"):
+            os.remove(path)
+            return
+        if "snapshot" not in base and not base_unchanged(base):
+            messagebox.showerror("Recover Unsaved Changes", f"{name} has changed since the changes were made; they cannot be replayed.")
+            os.remove(path)
+            return
+        self.stop_journal()
+        self.text_area.delete(1.0, tk.END)
+        self.text_area.insert("1.0", base["snapshot"] if "snapshot" in base else base_text(base))
+        for record in records:
+            if record["op"] == "insert":
+                self.text_area.insert(record["at"], record["text"])
+            else:
+                self.text_area.delete(record["start"], record["end"])
+        os.remove(path)
+        self.file_path = base.get("document")
+        # Unsaved changes stay recoverable: the new journal starts from the recovered state
+        self.start_journal(self.text_area.get("1.0", "end-1c"))
+
+    def exit(self):
+        self.stop_journal()
+        self.root.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -1,17 +1,608 @@
 import tkinter as tk
 from tkinter import ttk, font, colorchooser, filedialog, messagebox, simpledialog
 from tkinter.scrolledtext import ScrolledText
-from spellchecker import SpellChecker
+from text_hooks import TextChangeHook, line_of
+from large_file import LineIndex, LargeFileView, is_large_file
+from word_index import load_word_index
+from edit_journal import EditJournal, base_text, base_unchanged, find_recoverable, journal_path, read_journal
+import rich_format
+from rich_format import RichDocument
+import argparse
+import base64
+import os
+import queue
 import re
+import shutil
+import sys
+import threading
+import time
 import webbrowser
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from contextlib import contextmanager
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+# Tags that are recomputed at runtime rather than being part of the document
+TRANSIENT_TAGS = ("sel", "misspelled", "search_match")
+AUTOSAVE_INTERVAL_MS = 1000
+# Runs inserted per Text.insert call when loading a rich document
+RUNS_PER_INSERT = 5000
+FILE_TYPES = [("Rich documents", "*" + rich_format.EXTENSION), ("Text files", "*.txt"), ("All files", "*")]
+
+class StartupTimer:
+    """
+    Wall-clock time of each startup phase, measured from the previous mark.
+    """
+
+    def __init__(self, start=None):
+        self.last = start if start is not None else time.perf_counter()
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def add(self, phase, seconds):
+        # For phases that overlap the others, such as background loading
+        self.phases.append((phase, seconds))
+
+    def report(self):
+        return " | ".join(f"{phase}: {seconds * 1000:.1f} ms" for phase, seconds in self.phases)
+
+class IncrementalSpellChecker:
+    """
+    Spell checks only the lines edited since the last pass.
+
+    Dictionary lookups run on a worker thread. Words already classified are
+    memoized, so most lines are settled from the memo alone. Tags are applied
+    on the Tk thread a few hundred lines at a time, which keeps large files
+    responsive right after they are opened.
+
+    When given a `loader` instead of a `spell_checker`, the worker calls it
+    first, so the editor can start before the dictionary is loaded. Words
+    looked up in the meantime are queued and answered once it is ready.
+    """
+
+    LINES_PER_SLICE = 200
+
+    def __init__(self, root, text_area, hook, spell_checker=None, loader=None):
+        self.root = root
+        self.text_area = text_area
+        self.spell_checker = spell_checker
+        self.loader = loader
+        self.ready = threading.Event()
+        self.load_seconds = 0.0
+        self.known_good = set()
+        self.known_bad = set()
+        self.dirty_lines = set()
+        # Words handed to the worker but not answered yet, and the lines waiting on them
+        self.pending_words = set()
+        self.waiting_lines = set()
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.scheduled = None
+        self.polling = False
+        self.text_area.tag_configure("misspelled", foreground="red", underline=1)
+        hook.add_listener(self.on_edit)
+        threading.Thread(target=self._lookup_worker, daemon=True).start()
+
+    def on_edit(self, edit):
+        first, last = line_of(edit.start), line_of(edit.end)
+        shift = edit.text.count("\n")
+        if not shift:
+            # Same-line edits leave every other line where it was
+            pass
+        elif edit.kind == "insert":
+            self.dirty_lines = {line + shift if line > first else line for line in self.dirty_lines}
+            self.waiting_lines = {line + shift if line > first else line for line in self.waiting_lines}
+        else:
+            # Lines inside the deleted range collapse onto its first line
+            self.dirty_lines = {line - shift if line > last else min(line, first) for line in self.dirty_lines}
+            self.waiting_lines = {line - shift if line > last else min(line, first) for line in self.waiting_lines}
+        if edit.kind == "delete":
+            last = first
+        self.dirty_lines.update(range(first, last + 1))
+
+    def _lookup_worker(self):
+        if self.spell_checker is None:
+            start = time.perf_counter()
+            try:
+                self.spell_checker = self.loader()
+            except Exception as e:
+                # Without a dictionary every word is answered as known, so nothing waits forever
+                print(f"Spell checking is off: no dictionary could be loaded ({e})", file=sys.stderr)
+            self.load_seconds = time.perf_counter() - start
+        self.ready.set()
+        while True:
+            words = self.requests.get()
+            misspelled = self.spell_checker.unknown(words) if self.spell_checker is not None else set()
+            self.results.put((words, misspelled))
+
+    def check(self):
+        if self.scheduled is None:
+            self.scheduled = self.root.after_idle(self._check_slice)
+
+    def _check_slice(self):
+        self.scheduled = None
+        last_line = line_of(self.text_area.index("end-1c"))
+        lines = sorted(line for line in self.dirty_lines if line <= last_line)[:self.LINES_PER_SLICE]
+        self.dirty_lines.difference_update(lines)
+        self.dirty_lines = {line for line in self.dirty_lines if line <= last_line}
+        unknown = set()
+        for line in lines:
+            line_unknown = self._tag_line(line)
+            if line_unknown:
+                unknown.update(line_unknown)
+                self.waiting_lines.add(line)
+        unknown -= self.pending_words
+        if unknown:
+            self.pending_words.update(unknown)
+            self.requests.put(list(unknown))
+        if self.pending_words and not self.polling:
+            self.polling = True
+            self.root.after(50, self._poll_results)
+        if self.dirty_lines:
+            self.scheduled = self.root.after(1, self._check_slice)
+
+    def _tag_line(self, line):
+        # Re-tags one line from the memo; returns the words the memo cannot answer yet
+        text = self.text_area.get(f"{line}.0", f"{line}.end")
+        self.text_area.tag_remove("misspelled", f"{line}.0", f"{line}.end")
+        unknown = set()
+        for match in WORD_PATTERN.finditer(text):
+            word = match.group().lower()
+            if word in self.known_bad:
+                self.text_area.tag_add("misspelled", f"{line}.{match.start()}", f"{line}.{match.end()}")
+            elif word not in self.known_good:
+                unknown.add(word)
+        return unknown
+
+    def _poll_results(self):
+        answered = False
+        while True:
+            try:
+                words, misspelled = self.results.get_nowait()
+            except queue.Empty:
+                break
+            answered = True
+            misspelled = {word.lower() for word in misspelled}
+            for word in words:
+                (self.known_bad if word in misspelled else self.known_good).add(word)
+            self.pending_words.difference_update(words)
+        if answered:
+            # Lines that were waiting on the dictionary can now be settled from the memo
+            self.dirty_lines.update(self.waiting_lines)
+            self.waiting_lines.clear()
+            self.check()
+        if self.pending_words:
+            self.root.after(50, self._poll_results)
+        else:
+            self.polling = False
+
+class UndoJournal:
+    """
+    Undo/redo history kept as a log of edits instead of document snapshots.
+
+    Each entry is a list of (kind, start, end, text) operations taken from the
+    TextChangeHook, so it costs only as much memory as the text it changed.
+    Consecutive single-character typing or deleting is coalesced into one
+    entry. When the text held by all entries exceeds `limit` characters, the
+    oldest entries are dropped. Undo applies the inverse operations in place,
+    so text and formatting outside the edited range are left alone.
+    """
+
+    def __init__(self, text_area, hook, limit=4 * 2 ** 20):
+        self.text_area = text_area
+        self.limit = limit
+        self.undo_entries = deque()
+        self.redo_entries = []
+        self.size = 0
+        self.applying = False
+        self.grouping = 0
+        self.coalesce = False
+        hook.add_listener(self.on_edit)
+
+    def on_edit(self, edit):
+        if self.applying:
+            return
+        self.redo_entries.clear()
+        op = (edit.kind, edit.start, edit.end, edit.text)
+        if self.grouping and self.undo_entries:
+            self.undo_entries[-1].append(op)
+        elif not (self.coalesce and self._merge(op)):
+            self.undo_entries.append([op])
+        self.size += len(edit.text)
+        # Only plain typing keeps extending the last entry
+        self.coalesce = not self.grouping and len(edit.text) == 1 and edit.text != "\n"
+        self._evict()
+
+    def _merge(self, op):
+        kind, start, end, text = op
+        if len(text) != 1 or text == "\n" or len(self.undo_entries[-1]) != 1:
+            return False
+        last_kind, last_start, last_end, last_text = self.undo_entries[-1][0]
+        if kind != last_kind:
+            return False
+        if kind == "insert" and start == last_end:
+            if text.isspace() and not last_text[-1].isspace():
+                # A new word starts a new undo step
+                return False
+            self.undo_entries[-1][0] = (kind, last_start, end, last_text + text)
+        elif kind == "delete" and end == last_start:
+            # Backspace: the deleted range grows to the left
+            self.undo_entries[-1][0] = (kind, start, last_end, text + last_text)
+        elif kind == "delete" and start == last_start:
+            # Forward delete: the text after the cursor keeps moving into place
+            self.undo_entries[-1][0] = (kind, start, last_end, last_text + text)
+        else:
+            return False
+        return True
+
+    def _evict(self):
+        # The newest entry is always kept, even when it alone is over the limit
+        while self.size > self.limit and len(self.undo_entries) > 1:
+            entry = self.undo_entries.popleft()
+            self.size -= sum(len(op[3]) for op in entry)
+
+    def begin_group(self):
+        if not self.grouping:
+            self.undo_entries.append([])
+            self.coalesce = False
+        self.grouping += 1
+
+    def end_group(self):
+        self.grouping -= 1
+        if not self.grouping and self.undo_entries and not self.undo_entries[-1]:
+            self.undo_entries.pop()
+
+    @contextmanager
+    def group(self):
+        """
+        Records every edit made inside the block as a single undo entry.
+        Use begin_group/end_group when the edits are spread over several callbacks.
+        """
+        self.begin_group()
+        try:
+            yield
+        finally:
+            self.end_group()
+
+    def clear(self):
+        self.undo_entries.clear()
+        self.redo_entries.clear()
+        self.size = 0
+        self.coalesce = False
+
+    def _apply(self, entry, reverse):
+        self.applying = True
+        try:
+            ops = reversed(entry) if reverse else entry
+            for kind, start, end, text in ops:
+                if (kind == "insert") == reverse:
+                    self.text_area.delete(start, f"{start}+{len(text)}c")
+                    cursor = start
+                else:
+                    self.text_area.insert(start, text)
+                    cursor = f"{start}+{len(text)}c"
+            self.text_area.mark_set(tk.INSERT, cursor)
+            self.text_area.see(tk.INSERT)
+        finally:
+            self.applying = False
+            self.coalesce = False
+
+    def undo(self):
+        if not self.undo_entries:
+            return False
+        entry = self.undo_entries.pop()
+        self.size -= sum(len(op[3]) for op in entry)
+        self._apply(entry, reverse=True)
+        self.redo_entries.append(entry)
+        return True
+
+    def redo(self):
+        if not self.redo_entries:
+            return False
+        entry = self.redo_entries.pop()
+        self._apply(entry, reverse=False)
+        self.undo_entries.append(entry)
+        self.size += sum(len(op[3]) for op in entry)
+        self._evict()
+        return True
+
+class DocumentStats:
+    """
+    Word, character and line counts kept up to date edit by edit.
+
+    Word counts are stored per line. An edit only re-counts the lines it
+    touched, so the cost follows the size of the edit, not of the document.
+    Listeners added with add_listener are called with the stats object at most
+    once every `delay` milliseconds, however fast the edits arrive.
+    """
+
+    def __init__(self, root, text_area, hook, delay=100):
+        self.root = root
+        self.text_area = text_area
+        self.delay = delay
+        self.line_words = [0]
+        self.words = 0
+        # Excludes the trailing newline Tk always keeps
+        self.chars = 0
+        self.listeners = []
+        self.scheduled = None
+        hook.add_listener(self.on_edit)
+
+    @property
+    def lines(self):
+        return len(self.line_words)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def on_edit(self, edit):
+        first, last = line_of(edit.start), line_of(edit.end)
+        if edit.kind == "insert":
+            self.chars += len(edit.text)
+            replaced = 1
+        else:
+            self.chars -= len(edit.text)
+            replaced = last - first + 1
+            last = first
+        counts = [len(self.text_area.get(f"{line}.0", f"{line}.end").split()) for line in range(first, last + 1)]
+        old = self.line_words[first - 1:first - 1 + replaced]
+        self.line_words[first - 1:first - 1 + replaced] = counts
+        self.words += sum(counts) - sum(old)
+        self.schedule()
+
+    def schedule(self):
+        if self.scheduled is None:
+            self.scheduled = self.root.after(self.delay, self._render)
+
+    def _render(self):
+        self.scheduled = None
+        for listener in self.listeners:
+            listener(self)
+
+class MatchIndex:
+    """
+    Matches of one query over a snapshot of the text, filled in by a worker thread.
+
+    starts/ends are character offsets into the snapshot and line_starts maps
+    them back to Tk "line.col" indexes. They only grow, so the Tk thread can
+    read them while the scan is still running.
+    """
+
+    def __init__(self):
+        self.starts = array("Q")
+        self.ends = array("Q")
+        self.replacements = []
+        self.line_starts = array("Q", [0])
+        self.lines_done = threading.Event()
+        self.done = threading.Event()
+        self.cancelled = False
+
+    def __len__(self):
+        return len(self.starts)
+
+    def to_index(self, offset):
+        line = bisect_right(self.line_starts, offset) - 1
+        return f"{line + 1}.{offset - self.line_starts[line]}"
+
+    def to_offset(self, index):
+        line, col = map(int, index.split("."))
+        return self.line_starts[line - 1] + col
+
+class TextSearch:
+    """
+    Literal, regex and whole-word search served from a MatchIndex.
+
+    The text is copied once per query and scanned on a worker thread, so the
+    first matches are usable before the scan ends. Any edit invalidates the
+    index and the next request scans again. Replace-all edits only the
+    matched ranges, last match first, a batch per Tk callback, so tags outside
+    the matches survive and the UI keeps responding.
+    """
+
+    MODES = ("literal", "regex", "word")
+    BATCH = 500
+
+    def __init__(self, root, text_area, hook, undo_journal):
+        self.root = root
+        self.text_area = text_area
+        self.undo_journal = undo_journal
+        self.index = None
+        self.query = None
+        self.replacing = False
+        self.text_area.tag_configure("search_match", background="yellow")
+        hook.add_listener(self.on_edit)
+
+    @staticmethod
+    def compile(pattern, mode="literal", match_case=True):
+        """
+        Raises:
+            re.error: If a regex pattern is invalid.
+        """
+        if mode == "literal":
+            pattern = re.escape(pattern)
+        elif mode == "word":
+            pattern = r"\b" + re.escape(pattern) + r"\b"
+        return re.compile(pattern, 0 if match_case else re.IGNORECASE)
+
+    @staticmethod
+    def check_replacement(regex, replacement):
+        """
+        Raises:
+            re.error: If a regex replacement template has a bad escape or group reference.
+        """
+        try:
+            # sub() parses the template before scanning, even when there is nothing to match
+            regex.sub(replacement, "")
+        except (re.error, IndexError) as e:
+            # Unknown group names raise IndexError; either would otherwise kill the scan thread
+            raise re.error(f"{e} (in the replacement)") from e
+
+    def on_edit(self, edit):
+        if not self.replacing:
+            self.invalidate()
+
+    def invalidate(self):
+        if self.index is not None:
+            self.index.cancelled = True
+            self.index = None
+            self.query = None
+
+    def search(self, pattern, mode="literal", match_case=True, replacement=None):
+        """
+        Starts indexing the matches of a query, unless the current index already holds them.
+
+        Returns:
+            MatchIndex: The index being filled.
+        """
+        query = (pattern, mode, match_case, replacement)
+        if self.index is not None and query == self.query:
+            return self.index
+        regex = self.compile(pattern, mode, match_case)
+        if replacement is not None and mode == "regex":
+            self.check_replacement(regex, replacement)
+        self.invalidate()
+        self.index = MatchIndex()
+        self.query = query
+        text = self.text_area.get("1.0", "end-1c")
+        threading.Thread(target=self._scan, args=(self.index, regex, text, mode, replacement), daemon=True).start()
+        return self.index
+
+    @staticmethod
+    def _scan(index, regex, text, mode, replacement):
+        newline = text.find("\n")
+        while newline >= 0:
+            index.line_starts.append(newline + 1)
+            newline = text.find("\n", newline + 1)
+        index.lines_done.set()
+        for match in regex.finditer(text):
+            if index.cancelled:
+                return
+            if match.start() == match.end():
+                continue
+            if replacement is not None:
+                # Only regex mode expands group references such as \1
+                index.replacements.append(match.expand(replacement) if mode == "regex" else replacement)
+            index.starts.append(match.start())
+            index.ends.append(match.end())
+        index.done.set()
+
+    def _select(self, index, i, forward):
+        start, end = index.to_index(index.starts[i]), index.to_index(index.ends[i])
+        self.text_area.tag_remove("sel", "1.0", "end")
+        self.text_area.tag_add("sel", start, end)
+        self.text_area.mark_set(tk.INSERT, end if forward else start)
+        self.text_area.see(start)
+
+    def find(self, pattern, mode="literal", match_case=True, forward=True, on_result=None):
+        """
+        Selects the next (or previous) match from the cursor, wrapping around the document.
+        on_result is called with the total number of matches once the scan is complete.
+        """
+        index = self.search(pattern, mode, match_case)
+        retry = lambda: self.root.after(50, lambda: self.find(pattern, mode, match_case, forward, on_result))
+        if not index.lines_done.is_set():
+            retry()
+            return
+        if self.text_area.tag_ranges("sel") and not forward:
+            cursor = index.to_offset(self.text_area.index("sel.first"))
+        else:
+            cursor = index.to_offset(self.text_area.index(tk.INSERT))
+        count = len(index)
+        if forward:
+            i = bisect_left(index.starts, cursor, 0, count)
+            if i == count:
+                i = 0
+        else:
+            i = bisect_left(index.starts, cursor, 0, count) - 1
+            if i < 0:
+                i = count - 1
+        if forward and i == 0 and count and index.starts[0] < cursor and not index.done.is_set():
+            # Wrapping around too early would skip matches still being scanned
+            count = 0
+        if count and (forward or index.done.is_set()):
+            self._select(index, i, forward)
+            self._report(index, on_result)
+        elif index.done.is_set():
+            self._report(index, on_result)
+        else:
+            retry()
+
+    def _report(self, index, on_result):
+        if on_result is None or self.index is not index:
+            return
+        if index.done.is_set():
+            on_result(len(index))
+        else:
+            self.root.after(50, lambda: self._report(index, on_result))
+
+    def highlight_all(self, pattern, mode="literal", match_case=True, on_result=None):
+        self.text_area.tag_remove("search_match", "1.0", "end")
+        index = self.search(pattern, mode, match_case)
+        self._highlight_batch(index, 0, on_result)
+
+    def _highlight_batch(self, index, position, on_result):
+        if self.index is not index:
+            return
+        end = min(len(index), position + self.BATCH)
+        for i in range(position, end):
+            self.text_area.tag_add("search_match", index.to_index(index.starts[i]), index.to_index(index.ends[i]))
+        if index.done.is_set() and end == len(index):
+            if on_result is not None:
+                on_result(end)
+            return
+        self.root.after(1 if end > position else 50, lambda: self._highlight_batch(index, end, on_result))
+
+    def clear_highlight(self):
+        self.text_area.tag_remove("search_match", "1.0", "end")
+
+    def replace_all(self, pattern, replacement, mode="literal", match_case=True, on_result=None):
+        """
+        Replaces every match in place once the scan is complete. Each
+        replacement takes the tags found at the start of its match. The whole
+        operation is one undo entry.
+        """
+        index = self.search(pattern, mode, match_case, replacement)
+        if not index.done.is_set():
+            self.root.after(50, lambda: self.replace_all(pattern, replacement, mode, match_case, on_result))
+            return
+        self.replacing = True
+        self.undo_journal.begin_group()
+        # The widget is read-only between batches so typing cannot shift the remaining matches
+        self.text_area.configure(state="disabled")
+        self._replace_batch(index, len(index), on_result)
+
+    def _replace_batch(self, index, position, on_result):
+        start = max(0, position - self.BATCH)
+        self.text_area.configure(state="normal")
+        for i in range(position - 1, start - 1, -1):
+            first, last = index.to_index(index.starts[i]), index.to_index(index.ends[i])
+            tags = tuple(tag for tag in self.text_area.tag_names(first) if tag not in ("sel", "search_match"))
+            self.text_area.delete(first, last)
+            self.text_area.insert(first, index.replacements[i], tags)
+        if start > 0:
+            self.text_area.configure(state="disabled")
+            self.root.after(1, lambda: self._replace_batch(index, start, on_result))
+            return
+        self.undo_journal.end_group()
+        self.replacing = False
+        self.invalidate()
+        if on_result is not None:
+            on_result(len(index))
 
 class TextEditor:
-    def __init__(self, root):
+    def __init__(self, root, startup=None):
         self.root = root
+        self.startup = startup or StartupTimer()
         self.root.title("Advanced Text Editor")
         self.root.geometry("800x600")
 
-        self.text_area = ScrolledText(self.root, wrap=tk.WORD, undo=True)
+        # Undo is handled by UndoJournal; Tk's own undo stack would keep a second copy of every edit
+        self.text_area = ScrolledText(self.root, wrap=tk.WORD, undo=False)
         self.text_area.pack(expand=True, fill='both')
 
         self.create_menu()
@@ -20,15 +611,40 @@ class TextEditor:
 
         self.current_font = font.Font(family="Arial", size=12)
         self.text_area.configure(font=self.current_font)
+        self.startup.mark("widgets")
 
-        self.spell_checker = SpellChecker()
+        self.text_hook = TextChangeHook(self.text_area)
+        # The word index loads on the spell checker's worker thread; see word_index.py
+        self.incremental_spell_checker = IncrementalSpellChecker(self.root, self.text_area, self.text_hook, loader=load_word_index)
         self.text_area.bind("<space>", self.check_spelling)
 
-        self.undo_stack = []
-        self.redo_stack = []
-        self.text_area.bind("<<Modified>>", self.track_changes)
+        self.undo_journal = UndoJournal(self.text_area, self.text_hook)
+        self.text_search = TextSearch(self.root, self.text_area, self.text_hook, self.undo_journal)
+        self.document_stats = DocumentStats(self.root, self.text_area, self.text_hook)
+        self.document_stats.add_listener(self.update_statusbar)
+        self.text_area.bind("<<Undo>>", self.undo)
+        self.text_area.bind("<<Redo>>", self.redo)
 
         self.link_tooltips = {}  # Store tooltips for links
+        # Embedded images: PhotoImage references (so they are not garbage collected)
+        # and the original bytes by embedded image name, which rich saves store
+        self.images = []
+        self.image_data = {}
+
+        # Set while a large file is open read-only through a LargeFileView
+        self.large_file = None
+        self.root.bind("<Control-g>", self.goto_line)
+
+        # Plain options of every formatting tag, by tag name (see style_tag)
+        self.tag_styles = {}
+        self.file_path = None
+        self.edit_journal = None
+        self.text_hook.add_listener(self.journal_edit)
+        self.text_hook.add_tag_listener(self.journal_tag)
+        self.start_journal()
+        self.root.after(AUTOSAVE_INTERVAL_MS, self.autosave)
+        self.root.after_idle(self.offer_recovery)
+        self.root.protocol("WM_DELETE_WINDOW", self.exit)
 
     def create_menu(self):
         menubar = tk.Menu(self.root)
@@ -41,7 +657,7 @@ class TextEditor:
         file_menu.add_command(label="Save", command=self.save_file)
         file_menu.add_command(label="Print", command=self.print_file)
         file_menu.add_separator()
-        file_menu.add_command(label="Exit", command=self.root.quit)
+        file_menu.add_command(label="Exit", command=self.exit)
 
         edit_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Edit", menu=edit_menu)
@@ -53,13 +669,14 @@ class TextEditor:
         edit_menu.add_command(label="Paste", command=self.paste)
         edit_menu.add_separator()
         edit_menu.add_command(label="Find and Replace", command=self.find_replace)
+        edit_menu.add_command(label="Go to Line", command=self.goto_line)
 
     def create_toolbar(self):
         toolbar = ttk.Frame(self.root)
         toolbar.pack(side=tk.TOP, fill=tk.X)
 
-        font_families = font.families()
-        self.font_family = ttk.Combobox(toolbar, values=font_families, width=30)
+        # Enumerating the installed fonts is slow, so it waits until the list is first opened
+        self.font_family = ttk.Combobox(toolbar, width=30, postcommand=self.load_font_families)
         self.font_family.set("Arial")
         self.font_family.bind("<<ComboboxSelected>>", self.change_font)
         self.font_family.pack(side=tk.LEFT, padx=5)
@@ -84,24 +701,69 @@ class TextEditor:
     def create_statusbar(self):
         self.statusbar = ttk.Label(self.root, text="", anchor=tk.W)
         self.statusbar.pack(side=tk.BOTTOM, fill=tk.X)
-        self.text_area.bind("<KeyRelease>", self.update_statusbar)
+        # Cursor moves change Line/Column without an edit; the render is still debounced
+        self.text_area.bind("<KeyRelease>", lambda event: self.document_stats.schedule())
+        self.text_area.bind("<ButtonRelease-1>", lambda event: self.document_stats.schedule())
 
-    def update_statusbar(self, event=None):
+    def update_statusbar(self, stats=None):
+        stats = stats or self.document_stats
         line, col = self.text_area.index(tk.INSERT).split('.')
-        words = len(self.text_area.get(1.0, tk.END).split())
-        self.statusbar.config(text=f"Line: {line} | Column: {col} | Words: {words}")
+        if self.large_file:
+            line = int(line) + self.large_file.top
+            self.statusbar.config(text=f"Line: {line} of {self.large_file.index.line_count} | Column: {col} | Read-only")
+            return
+        self.statusbar.config(text=f"Line: {line} | Column: {col} | Words: {stats.words}")
+
+    def load_font_families(self):
+        if not self.font_family.cget("values"):
+            self.font_family.configure(values=sorted(font.families()))
+
+    def report_startup(self):
+        # Called once the window is up; the dictionary phase is added when its load finishes
+        self.startup.mark("first idle")
+        self._report_dictionary()
+
+    def _report_dictionary(self):
+        checker = self.incremental_spell_checker
+        if not checker.ready.is_set():
+            self.root.after(20, self._report_dictionary)
+            return
+        self.startup.add("dictionary (background)", checker.load_seconds)
+        print(f"Startup: {self.startup.report()}", file=sys.stderr)
 
     def change_font(self, event=None):
         self.current_font.config(family=self.font_family.get(), size=int(self.font_size.get()))
         self.text_area.configure(font=self.current_font)
 
+    def style_tag(self, tag, **options):
+        """
+        Configures a formatting tag from plain, JSON-friendly options.
+
+        Options are the tag_configure ones, plus weight/slant for the font and
+        url for links. They are kept in tag_styles so the formatting can be
+        journaled and restored.
+        """
+        self.tag_styles[tag] = options
+        config = dict(options)
+        url = config.pop("url", None)
+        font_options = {key: config.pop(key) for key in ("weight", "slant") if key in config}
+        if font_options:
+            config["font"] = font.Font(**font_options)
+        self.text_area.tag_configure(tag, **config)
+        if url:
+            self.text_area.tag_bind(tag, "<Button-1>", lambda e: self.open_link(url))
+            self.text_area.tag_bind(tag, "<Enter>", lambda e: self.show_link_tooltip(e, url, tag))
+            self.text_area.tag_bind(tag, "<Leave>", lambda e: self.hide_link_tooltip(tag))
+        if self.edit_journal:
+            self.edit_journal.append({"op": "style", "tag": tag, "options": options})
+
     def toggle_bold(self):
         current_tags = self.text_area.tag_names("sel.first")
         if "bold" in current_tags:
             self.text_area.tag_remove("bold", "sel.first", "sel.last")
         else:
             self.text_area.tag_add("bold", "sel.first", "sel.last")
-        self.text_area.tag_configure("bold", font=font.Font(weight="bold"))
+        self.style_tag("bold", weight="bold")
 
     def toggle_italic(self):
         current_tags = self.text_area.tag_names("sel.first")
@@ -109,7 +771,7 @@ class TextEditor:
             self.text_area.tag_remove("italic", "sel.first", "sel.last")
         else:
             self.text_area.tag_add("italic", "sel.first", "sel.last")
-        self.text_area.tag_configure("italic", font=font.Font(slant="italic"))
+        self.style_tag("italic", slant="italic")
 
     def toggle_underline(self):
         current_tags = self.text_area.tag_names("sel.first")
@@ -117,17 +779,17 @@ class TextEditor:
             self.text_area.tag_remove("underline", "sel.first", "sel.last")
         else:
             self.text_area.tag_add("underline", "sel.first", "sel.last")
-        self.text_area.tag_configure("underline", underline=1)
+        self.style_tag("underline", underline=1)
 
     def align(self, alignment):
         self.text_area.tag_add(alignment, "sel.first", "sel.last")
-        self.text_area.tag_configure(alignment, justify=alignment)
+        self.style_tag(alignment, justify=alignment)
 
     def change_color(self):
         color = colorchooser.askcolor()[1]
         if color:
             self.text_area.tag_add("color", "sel.first", "sel.last")
-            self.text_area.tag_configure("color", foreground=color)
+            self.style_tag("color", foreground=color)
 
     def insert_link(self):
         try:
@@ -146,10 +808,7 @@ class TextEditor:
 
             tag_name = f"link-{start_index}"
             self.text_area.tag_add(tag_name, start_index, end_index)
-            self.text_area.tag_configure(tag_name, foreground="blue", underline=1)
-            self.text_area.tag_bind(tag_name, "<Button-1>", lambda e: self.open_link(url))
-            self.text_area.tag_bind(tag_name, "<Enter>", lambda e: self.show_link_tooltip(e, url, tag_name))
-            self.text_area.tag_bind(tag_name, "<Leave>", lambda e: self.hide_link_tooltip(tag_name))
+            self.style_tag(tag_name, foreground="blue", underline=1, url=url)
 
 
     def show_link_tooltip(self, event, url, tag_name):
@@ -172,27 +831,274 @@ class TextEditor:
     def insert_image(self):
         file_path = filedialog.askopenfilename(filetypes=[("Image files", "*.png *.jpg *.jpeg *.gif")])
         if file_path:
-            image = tk.PhotoImage(file=file_path)
-            self.text_area.image_create(tk.INSERT, image=image)
-            self.text_area.image = image  # Keep a reference to prevent garbage collection
+            with open(file_path, 'rb') as file:
+                self.create_image(tk.INSERT, file.read())
+
+    def create_image(self, index, data):
+        image = tk.PhotoImage(data=base64.b64encode(data))
+        name = self.text_area.image_create(index, image=image)
+        self.images.append(image)  # Keep a reference to prevent garbage collection
+        self.image_data[name] = data
 
     def new_file(self):
-        self.text_area.delete(1.0, tk.END)
+        self.close_large_file()
+        with self.undo_journal.group():
+            self.text_area.delete(1.0, tk.END)
+        self.file_path = None
+        self.start_journal()
 
     def open_file(self):
-        file = filedialog.askopenfile(mode='r')
-        if file:
-            content = file.read()
+        file_path = filedialog.askopenfilename(filetypes=FILE_TYPES)
+        if file_path:
+            if file_path.endswith(rich_format.EXTENSION):
+                # The current document and its journal are only replaced once the load has succeeded
+                self.wait_for_io(rich_format.load_async(file_path), lambda document: self.opened_rich_document(file_path, document))
+                return
+            self.close_large_file()
+            # Loading is not journaled: the journal starts from the file as it is on disk
+            self.stop_journal()
+            if is_large_file(file_path):
+                # Only a window of lines is ever in the widget; see large_file.LargeFileView
+                self.large_file = LargeFileView(self.text_area, LineIndex(file_path), on_page=self.on_large_file_page)
+                return
+            with open(file_path, 'r') as file:
+                content = file.read()
             self.text_area.delete(1.0, tk.END)
             self.text_area.insert(tk.INSERT, content)
-            file.close()
+            self.undo_journal.clear()
+            self.incremental_spell_checker.check()
+            self.file_path = file_path
+            self.start_journal()
+
+    def on_large_file_page(self, view):
+        # Paging is not an edit the user can undo
+        self.undo_journal.clear()
+        self.incremental_spell_checker.check()
+        self.document_stats.schedule()
+
+    def close_large_file(self):
+        if self.large_file:
+            self.large_file.close()
+            self.large_file = None
+            self.text_area.delete(1.0, tk.END)
+            self.undo_journal.clear()
+            self.file_path = None
+            self.start_journal()
+
+    def goto_line(self, event=None):
+        line = simpledialog.askinteger("Go to Line", "Line number:", parent=self.root, minvalue=1)
+        if line is None:
+            return
+        if self.large_file:
+            self.large_file.goto_line(line)
+        else:
+            self.text_area.mark_set(tk.INSERT, f"{line}.0")
+            self.text_area.see(tk.INSERT)
+        self.document_stats.schedule()
 
     def save_file(self):
-        file = filedialog.asksaveasfile(mode='w', defaultextension=".txt")
-        if file:
-            content = self.text_area.get(1.0, tk.END)
-            file.write(content)
-            file.close()
+        if self.large_file:
+            # The widget only holds a window of the file, and the file cannot have changed
+            file_path = filedialog.asksaveasfilename(defaultextension=".txt")
+            if file_path:
+                shutil.copyfile(self.large_file.index.path, file_path)
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=rich_format.EXTENSION, filetypes=FILE_TYPES)
+        if not file_path:
+            return
+        if file_path.endswith(rich_format.EXTENSION):
+            self.save_rich_document(file_path)
+            return
+        with open(file_path, 'w') as file:
+            file.write(self.text_area.get(1.0, tk.END))
+        # Edits made before the save need no replaying. The journal restarts from a snapshot,
+        # which also keeps the formatting that the plain-text file does not
+        self.file_path = file_path
+        self.start_journal(self.snapshot())
+
+    def to_rich_document(self):
+        """
+        Captures the text, tags and images in one Text.dump call.
+        """
+        document = RichDocument(meta={"tag_styles": self.tag_styles})
+        pieces = []
+        active = []
+        offset = 0
+        for key, value, index in self.text_area.dump("1.0", "end-1c", text=True, tag=True, image=True):
+            if key == "text":
+                pieces.append(value)
+                document.add_run(len(value), document.style_id(sorted(active)))
+                offset += len(value)
+            elif key == "tagon" and value not in TRANSIENT_TAGS:
+                active.append(value)
+            elif key == "tagoff" and value in active:
+                active.remove(value)
+            elif key == "image" and value in self.image_data:
+                document.add_image(offset, self.image_data[value])
+        document.text = "".join(pieces)
+        return document
+
+    def load_rich_document(self, document):
+        """
+        Replaces the contents with a RichDocument. Text goes in with its tags
+        a few thousand runs per Text.insert call, so the cost follows the number
+        of style changes rather than the number of characters.
+        """
+        self.text_area.delete("1.0", tk.END)
+        for tag, options in document.meta.get("tag_styles", {}).items():
+            self.style_tag(tag, **options)
+        args = []
+        for text, tags in document.iter_runs():
+            args.append(text)
+            args.append(tuple(tags))
+            if len(args) >= 2 * RUNS_PER_INSERT:
+                self.text_area.insert(tk.END, *args)
+                args = []
+        if args:
+            self.text_area.insert(tk.END, *args)
+        # Images go in last one first, so the offsets of the ones before stay valid
+        starts = document.line_starts()
+        for offset, digest in reversed(document.images):
+            line, col = document.line_col(offset, starts)
+            self.create_image(f"{line}.{col}", document.blobs[digest])
+        self.undo_journal.clear()
+        self.incremental_spell_checker.check()
+
+    def wait_for_io(self, future, on_done):
+        # Rich saves and loads run on rich_format's I/O thread; results are picked up here
+        if not future.done():
+            self.root.after(20, lambda: self.wait_for_io(future, on_done))
+            return
+        try:
+            result = future.result()
+        except (OSError, ValueError) as e:
+            # A failed save leaves the editor writable again; a failed load leaves a large-file view read-only
+            if self.large_file is None:
+                self.text_area.configure(state="normal")
+            messagebox.showerror("Error", str(e))
+            return
+        on_done(result)
+
+    def opened_rich_document(self, file_path, document):
+        self.close_large_file()
+        self.stop_journal()
+        self.load_rich_document(document)
+        self.file_path = file_path
+        self.start_journal()
+
+    def save_rich_document(self, file_path):
+        document = self.to_rich_document()
+        # Read-only until the file is written, so no edit falls between the save and the new journal
+        self.text_area.configure(state="disabled")
+        self.wait_for_io(rich_format.save_async(file_path, document), lambda result: self.saved_rich_document(file_path))
+
+    def saved_rich_document(self, file_path):
+        self.text_area.configure(state="normal")
+        self.file_path = file_path
+        self.start_journal()
+        self.statusbar.config(text=f"Saved {file_path}")
+
+    def start_journal(self, snapshot=None):
+        self.stop_journal()
+        path = journal_path("ms_editor_2", self.file_path)
+        try:
+            self.edit_journal = EditJournal(path, "ms_editor_2", self.file_path, snapshot)
+        except OSError:
+            # The editor still works without a writable recovery directory, only without autosave
+            self.edit_journal = None
+        self.root.title("Advanced Text Editor" if self.edit_journal else "Advanced Text Editor (autosave off)")
+
+    def stop_journal(self):
+        if self.edit_journal:
+            self.edit_journal.discard()
+            self.edit_journal = None
+
+    def journal_edit(self, edit):
+        if not self.edit_journal:
+            return
+        if edit.kind == "insert":
+            self.edit_journal.append({"op": "insert", "at": edit.start, "text": edit.text})
+        else:
+            self.edit_journal.append({"op": "delete", "start": edit.start, "end": edit.end})
+
+    def journal_tag(self, change):
+        if self.edit_journal and change.tag not in TRANSIENT_TAGS:
+            self.edit_journal.append({"op": "tag_" + change.kind, "tag": change.tag, "ranges": change.ranges})
+
+    def autosave(self):
+        if self.edit_journal:
+            self.edit_journal.flush()
+            if self.edit_journal.needs_checkpoint():
+                self.edit_journal.checkpoint(self.snapshot())
+        self.root.after(AUTOSAVE_INTERVAL_MS, self.autosave)
+
+    def snapshot(self):
+        tags = {}
+        for tag in self.text_area.tag_names():
+            ranges = self.text_area.tag_ranges(tag)
+            if tag not in TRANSIENT_TAGS and ranges:
+                tags[tag] = [[str(ranges[i]), str(ranges[i + 1])] for i in range(0, len(ranges), 2)]
+        return {"text": self.text_area.get("1.0", "end-1c"), "styles": self.tag_styles, "tags": tags}
+
+    def restore_snapshot(self, snapshot):
+        self.text_area.delete("1.0", tk.END)
+        self.text_area.insert("1.0", snapshot["text"])
+        for tag, options in snapshot.get("styles", {}).items():
+            self.style_tag(tag, **options)
+        for tag, ranges in snapshot.get("tags", {}).items():
+            for start, end in ranges:
+                self.text_area.tag_add(tag, start, end)
+
+    def apply_record(self, record):
+        op = record["op"]
+        if op == "insert":
+            self.text_area.insert(record["at"], record["text"])
+        elif op == "delete":
+            self.text_area.delete(record["start"], record["end"])
+        elif op in ("tag_add", "tag_remove"):
+            for start, end in record["ranges"]:
+                (self.text_area.tag_add if op == "tag_add" else self.text_area.tag_remove)(record["tag"], start, end)
+        elif op == "style":
+            self.style_tag(record["tag"], **record["options"])
+
+    def offer_recovery(self):
+        for path, base in find_recoverable("ms_editor_2"):
+            base, records = read_journal(path)
+            if records or "snapshot" in base:
+                break
+            # Nothing was typed before that editor stopped
+            os.remove(path)
+        else:
+            return
+        name = base.get("document") or "an untitled document"
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(base.get("time", 0)))
+        if not messagebox.askyesno("Recover Unsaved Changes", f"Unsaved changes to {name} from {when} were found. Recover them?"):
+            os.remove(path)
+            return
+        if "snapshot" not in base and not base_unchanged(base):
+            messagebox.showerror("Recover Unsaved Changes", f"{name} has changed since the changes were made; they cannot be replayed.")
+            os.remove(path)
+            return
+        self.stop_journal()
+        if "snapshot" in base:
+            self.restore_snapshot(base["snapshot"])
+        elif (base.get("document") or "").endswith(rich_format.EXTENSION):
+            self.load_rich_document(rich_format.load(base["document"]))
+        else:
+            self.text_area.delete("1.0", tk.END)
+            self.text_area.insert("1.0", base_text(base))
+        for record in records:
+            self.apply_record(record)
+        os.remove(path)
+        self.file_path = base.get("document")
+        self.undo_journal.clear()
+        self.incremental_spell_checker.check()
+        # Unsaved changes stay recoverable: the new journal starts from the recovered state
+        self.start_journal(self.snapshot())
+
+    def exit(self):
+        self.stop_journal()
+        self.root.destroy()
 
     def print_file(self):
         content = self.text_area.get(1.0, tk.END)
@@ -215,60 +1121,76 @@ class TextEditor:
     def find_replace(self):
         find_window = tk.Toplevel(self.root)
         find_window.title("Find and Replace")
-        find_window.geometry("300x100")
+        find_window.geometry("420x170")
 
         ttk.Label(find_window, text="Find:").grid(row=0, column=0, padx=5, pady=5)
-        find_entry = ttk.Entry(find_window)
-        find_entry.grid(row=0, column=1, padx=5, pady=5)
+        find_entry = ttk.Entry(find_window, width=30)
+        find_entry.grid(row=0, column=1, columnspan=3, padx=5, pady=5)
 
         ttk.Label(find_window, text="Replace:").grid(row=1, column=0, padx=5, pady=5)
-        replace_entry = ttk.Entry(find_window)
-        replace_entry.grid(row=1, column=1, padx=5, pady=5)
+        replace_entry = ttk.Entry(find_window, width=30)
+        replace_entry.grid(row=1, column=1, columnspan=3, padx=5, pady=5)
 
-        ttk.Button(find_window, text="Replace All", command=lambda: self.replace_text(find_entry.get(), replace_entry.get())).grid(row=2, column=0, columnspan=2, pady=5)
+        mode = tk.StringVar(value="literal")
+        for column, (label, value) in enumerate((("Text", "literal"), ("Regex", "regex"), ("Whole word", "word"))):
+            ttk.Radiobutton(find_window, text=label, variable=mode, value=value).grid(row=2, column=column, padx=5)
+        match_case = tk.BooleanVar(value=True)
+        ttk.Checkbutton(find_window, text="Match case", variable=match_case).grid(row=2, column=3, padx=5)
 
-    def replace_text(self, find_str, replace_str):
-        content = self.text_area.get(1.0, tk.END)
-        new_content = content.replace(find_str, replace_str)
-        self.text_area.delete(1.0, tk.END)
-        self.text_area.insert(tk.INSERT, new_content)
+        result = ttk.Label(find_window, text="")
+        result.grid(row=4, column=0, columnspan=4)
 
-    def check_spelling(self, event):
-        content = self.text_area.get(1.0, tk.END)
-        words = re.findall(r'\b\w+\b', content)
-        misspelled = self.spell_checker.unknown(words)
-        for word in misspelled:
-            start_index = "1.0"
-            while True:
-                start_index = self.text_area.search(word, start_index, stopindex=tk.END)
-                if not start_index:
-                    break
-                end_index = f"{start_index}+{len(word)}c"
-                self.text_area.tag_add("misspelled", start_index, end_index)
-                start_index = end_index
-        self.text_area.tag_configure("misspelled", foreground="red", underline=1)
+        def run(action, **kwargs):
+            try:
+                action(find_entry.get(), mode=mode.get(), match_case=match_case.get(), **kwargs)
+            except re.error as e:
+                messagebox.showerror("Find and Replace", f"Invalid regular expression: {e}")
 
-    def track_changes(self, event):
-        if self.text_area.edit_modified():
-            self.undo_stack.append(self.text_area.get(1.0, tk.END))
-            self.redo_stack.clear()
-            self.text_area.edit_modified(False)
+        def found(count):
+            result.config(text=f"{count} matches" if count else "No matches")
 
-    def undo(self):
-        if len(self.undo_stack) > 1:
-            self.redo_stack.append(self.undo_stack.pop())
-            text = self.undo_stack[-1]
-            self.text_area.delete(1.0, tk.END)
-            self.text_area.insert(tk.INSERT, text)
+        ttk.Button(find_window, text="Previous", command=lambda: run(self.text_search.find, forward=False, on_result=found)).grid(row=3, column=0, pady=5)
+        ttk.Button(find_window, text="Next", command=lambda: run(self.text_search.find, on_result=found)).grid(row=3, column=1, pady=5)
+        ttk.Button(find_window, text="Highlight All", command=lambda: run(self.text_search.highlight_all, on_result=found)).grid(row=3, column=2, pady=5)
+        ttk.Button(find_window, text="Replace All", command=lambda: run(self.replace_text, replace_str=replace_entry.get())).grid(row=3, column=3, pady=5)
+        find_window.protocol("WM_DELETE_WINDOW", lambda: (self.text_search.clear_highlight(), find_window.destroy()))
 
-    def redo(self):
-        if self.redo_stack:
-            text = self.redo_stack.pop()
-            self.undo_stack.append(text)
-            self.text_area.delete(1.0, tk.END)
-            self.text_area.insert(tk.INSERT, text)
+    def replace_text(self, find_str, replace_str, mode="literal", match_case=True):
+        if not find_str:
+            return
+        if self.large_file:
+            # The view is read-only and saving copies the file on disk, so replacements would be lost
+            messagebox.showinfo("Find and Replace", "Large files are opened read-only; replace is not available.")
+            return
+        self.text_search.replace_all(find_str, replace_str, mode, match_case,
+                                     on_result=lambda count: self.statusbar.config(text=f"Replaced {count} matches"))
+
+    def check_spelling(self, event):
+        # Only lines edited since the last check are looked at (see IncrementalSpellChecker)
+        self.incremental_spell_checker.check()
+
+    def undo(self, event=None):
+        if self.text_search.replacing:
+            return "break"
+        self.undo_journal.undo()
+        return "break"
+
+    def redo(self, event=None):
+        if self.text_search.replacing:
+            return "break"
+        self.undo_journal.redo()
+        return "break"
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Advanced Text Editor")
+    parser.add_argument("--startup-times", action="store_true", help="Print how long each startup phase took")
+    args = parser.parse_args()
+
+    startup = StartupTimer()
     root = tk.Tk()
-    editor = TextEditor(root)
+    startup.mark("tk")
+    editor = TextEditor(root, startup)
+    startup.mark("editor")
+    if args.startup_times:
+        root.after_idle(editor.report_startup)
     root.mainloop()
\ No newline at end of file
@@ -1,54 +1,82 @@
 import qrcode
 import pyqrcode
 import os
-import csv
+import webbrowser
+import io
 from datetime import datetime
+from functools import lru_cache
+from transaction_ledger import TransactionLedger
 
-def generate_upi_qr_code(amount, upi_id):
+@lru_cache(maxsize=1024)
+def encode_qr(upi_payment_url):
+    # Encoding happens once per URL; rendering at other scales/formats reuses the matrix
+    # qr_code = pyqrcode.QRCode(upi_payment_url, error_correctors=pyqrcode.constants.ERROR_CORRECT_L)
+    return pyqrcode.QRCode(upi_payment_url, error='L')
+
+def generate_upi_qr_code(amount, upi_id, fmt=None, scale=6):
     """
     Generates a UPI QR code with the specified amount and UPI ID.
 
     Args:
         amount (float): The payment amount in rupees.
         upi_id (str): The UPI ID of the recipient.
+        fmt (str): "png" or "svg" to return the image bytes instead of writing a file.
+        scale (int): Pixels per QR module.
 
     Returns:
-        str: The QR code image file path.
+        str or bytes: The QR code image file path, or the image bytes when fmt is given.
     """
 
     # Construct the UPI payment URL
     upi_payment_url = f"upi://pay?pa={upi_id}&pn=Payment&am={amount}&cu=INR"
 
     # Create a QR code object
-    # qr_code = pyqrcode.QRCode(upi_payment_url, error_correctors=pyqrcode.constants.ERROR_CORRECT_L)
-    qr_code = pyqrcode.QRCode(upi_payment_url, error='L')
+    qr_code = encode_qr(upi_payment_url)
+
+    if fmt:
+        buffer = io.BytesIO()
+        if fmt == "svg":
+            qr_code.svg(buffer, scale=scale)
+        else:
+            qr_code.png(buffer, scale=scale)
+        return buffer.getvalue()
 
     # Generate the QR code image
-    qr_code.png("upi_payment_qr.png", scale=6)
+    qr_code.png("upi_payment_qr.png", scale=scale)
 
     return "upi_payment_qr.png"
 
 
-def store_transaction(amount, upi_id):
+def store_transaction(amount, upi_id, ledger=None):
     """
-    Stores the transaction details in a CSV file.
+    Stores the transaction details in the transaction ledger.
 
     Args:
         amount (float): The payment amount in rupees.
         upi_id (str): The UPI ID of the recipient.
+        ledger (TransactionLedger): Ledger to write to; opens transactions.db when omitted.
+
+    The old transaction_history.csv can be loaded once with
+    `python transaction_ledger.py import transaction_history.csv`.
     """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    filename = "transaction_history.csv"
-    file_exists = os.path.isfile(filename)
-    
-    with open(filename, 'a', newline='') as csvfile:
-        fieldnames = ['Timestamp', 'Amount', 'UPI ID']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        if not file_exists:
-            writer.writeheader()
-        
-        writer.writerow({'Timestamp': timestamp, 'Amount': amount, 'UPI ID': upi_id})
+    if ledger is not None:
+        ledger.record(amount, upi_id, timestamp=timestamp)
+        return
+
+    ledger = TransactionLedger()
+    try:
+        ledger.record(amount, upi_id, timestamp=timestamp)
+    finally:
+        ledger.close()
+
+
+def open_image(path):
+    # os.startfile only exists on Windows; elsewhere hand the file to the default viewer
+    if hasattr(os, "startfile"):
+        os.startfile(path)
+    else:
+        webbrowser.open("file://" + os.path.abspath(path))
 
 
 if __name__ == "__main__":
@@ -59,7 +87,7 @@ if __name__ == "__main__":
     print("QR code generated successfully. You can find it at:", qr_code_path)
 
     # Open the generated QR code image
-    os.startfile(qr_code_path)
+    open_image(qr_code_path)
 
     # # Open the generated QR code image
     # webbrowser.open(qr_code_path)
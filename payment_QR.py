@@ -1,43 +1,168 @@
 import qrcode
 import pyqrcode
+import argparse
+import hashlib
+import io
 import os
 import csv
+import webbrowser
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from urllib.parse import quote, urlencode
 
-def generate_upi_qr_code(amount, upi_id):
+QR_CACHE_SIZE = 1024
+
+def build_upi_url(amount, upi_id, payee_name="Payment"):
+    """
+    Builds the UPI deep link encoded in the QR code. Values are percent-encoded,
+    so a payee name such as "Acme & Sons" cannot break the link.
+    """
+    query = urlencode({"pa": upi_id, "pn": payee_name, "am": amount, "cu": "INR"}, quote_via=quote, safe="@")
+    return f"upi://pay?{query}"
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def encode_qr(upi_payment_url):
+    """
+    Encodes a payment URL into a QR module matrix.
+
+    pyqrcode does the Reed-Solomon encoding when the object is built and only
+    reads the matrix when rendering, so caching the object by URL lets repeat
+    requests render at any scale or format without re-encoding.
+    """
+    # qr_code = pyqrcode.QRCode(upi_payment_url, error_correctors=pyqrcode.constants.ERROR_CORRECT_L)
+    return pyqrcode.QRCode(upi_payment_url, error='L')
+
+def render_qr(qr_code, fmt="png", scale=6):
+    """
+    Renders an encoded QR code to PNG or SVG bytes in memory.
+    """
+    buffer = io.BytesIO()
+    if fmt == "svg":
+        qr_code.svg(buffer, scale=scale)
+    elif fmt == "png":
+        qr_code.png(buffer, scale=scale)
+    else:
+        raise ValueError(f"Unsupported QR image format: {fmt}")
+    return buffer.getvalue()
+
+def generate_upi_qr_code(amount, upi_id, payee_name="Payment", path="upi_payment_qr.png", fmt=None, scale=6):
     """
     Generates a UPI QR code with the specified amount and UPI ID.
 
     Args:
         amount (float): The payment amount in rupees.
         upi_id (str): The UPI ID of the recipient.
+        payee_name (str): Name shown to the payer.
+        path (str): Where to write the PNG.
+        fmt (str): "png" or "svg" to return the image bytes instead of writing a file.
+        scale (int): Pixels per QR module.
 
     Returns:
-        str: The QR code image file path.
+        str or bytes: The QR code image file path, or the image bytes when fmt is given.
     """
 
     # Construct the UPI payment URL
-    upi_payment_url = f"upi://pay?pa={upi_id}&pn=Payment&am={amount}&cu=INR"
+    upi_payment_url = build_upi_url(amount, upi_id, payee_name)
 
     # Create a QR code object
-    # qr_code = pyqrcode.QRCode(upi_payment_url, error_correctors=pyqrcode.constants.ERROR_CORRECT_L)
-    qr_code = pyqrcode.QRCode(upi_payment_url, error='L')
+    qr_code = encode_qr(upi_payment_url)
+
+    if fmt:
+        return render_qr(qr_code, fmt, scale)
 
     # Generate the QR code image
-    qr_code.png("upi_payment_qr.png", scale=6)
+    qr_code.png(path, scale=scale)
+
+    return path
 
-    return "upi_payment_qr.png"
+def _encode_png(url, scale, out_dir):
+    # Runs in a worker process: encode once, then either write the file or hand back the bytes
+    data = render_qr(encode_qr(url), "png", scale)
+    if out_dir is None:
+        return data
+    path = os.path.join(out_dir, _qr_filename(url))
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+def _qr_filename(url):
+    # Named after the payload, so identical invoices share one file and distinct ones never collide
+    return hashlib.sha256(url.encode()).hexdigest()[:20] + ".png"
+
+def generate_upi_qr_codes(records, out_dir="upi_qr_codes", zip_path=None, workers=None, scale=6, chunksize=64):
+    """
+    Generates QR codes for many payments in parallel.
+
+    Args:
+        records (iterable): (upi_id, amount, payee_name) tuples.
+        out_dir (str): Directory for the PNG files (ignored when zip_path is given).
+        zip_path (str): Bundle every image into this zip file instead of a directory.
+        workers (int): Worker processes (defaults to the CPU count).
+        scale (int): Pixels per QR module.
+        chunksize (int): Payloads handed to a worker at a time.
+
+    Returns:
+        list: One path per record, in input order. With zip_path these are the
+            member names inside the archive.
+    """
+    urls = [build_upi_url(amount, upi_id, payee_name) for upi_id, amount, payee_name in records]
+    # Identical payloads are encoded once and share a result
+    unique = list(dict.fromkeys(urls))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if zip_path:
+            results = {}
+            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) as archive:
+                for url, data in zip(unique, pool.map(_encode_png, unique, [scale] * len(unique), [None] * len(unique),
+                                                      chunksize=chunksize)):
+                    results[url] = _qr_filename(url)
+                    archive.writestr(results[url], data)
+        else:
+            os.makedirs(out_dir, exist_ok=True)
+            paths = pool.map(_encode_png, unique, [scale] * len(unique), [out_dir] * len(unique), chunksize=chunksize)
+            results = dict(zip(unique, paths))
+    return [results[url] for url in urls]
+
+def read_payment_records(path):
+    """
+    Reads (upi_id, amount, payee_name) records from a CSV with a header row of
+    "UPI ID", "Amount" and optionally "Payee Name".
+    """
+    with open(path, newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            yield row['UPI ID'], float(row['Amount']), row.get('Payee Name') or "Payment"
+
+def open_image(path):
+    # os.startfile only exists on Windows; elsewhere hand the file to the default viewer
+    if hasattr(os, "startfile"):
+        os.startfile(path)
+    else:
+        webbrowser.open("file://" + os.path.abspath(path))
 
 if __name__ == "__main__":
-    amount = float(input("Enter the payment amount in rupees: "))
-    # upi_id = input("Enter the UPI ID: ")
-    upi_id = "8250129352@apl"
+    parser = argparse.ArgumentParser(description="UPI payment QR code generator")
+    parser.add_argument("--batch", metavar="CSV", help="Generate a QR code for every row of CSV (columns: UPI ID, Amount, Payee Name)")
+    parser.add_argument("--out-dir", default="upi_qr_codes", help="Directory for --batch images")
+    parser.add_argument("--zip", help="Bundle --batch images into this zip file instead")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --batch")
+    args = parser.parse_args()
+
+    if args.batch:
+        paths = generate_upi_qr_codes(read_payment_records(args.batch), out_dir=args.out_dir, zip_path=args.zip,
+                                      workers=args.workers)
+        print(f"Generated {len(set(paths))} QR codes for {len(paths)} payments in", args.zip or args.out_dir)
+    else:
+        amount = float(input("Enter the payment amount in rupees: "))
+        # upi_id = input("Enter the UPI ID: ")
+        upi_id = "8250129352@apl"
 
-    qr_code_path = generate_upi_qr_code(amount, upi_id)
-    print("QR code generated successfully. You can find it at:", qr_code_path)
+        qr_code_path = generate_upi_qr_code(amount, upi_id)
+        print("QR code generated successfully. You can find it at:", qr_code_path)
 
-    # Open the generated QR code image
-    os.startfile(qr_code_path)
+        # Open the generated QR code image
+        open_image(qr_code_path)
 
-    # # Open the generated QR code image
-    # webbrowser.open(qr_code_path)
\ No newline at end of file
+        # # Open the generated QR code image
+        # webbrowser.open(qr_code_path)
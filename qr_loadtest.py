@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("server closed the connection")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def client(host, port, targets, deadline, remaining, latencies, statuses):
+    # One keep-alive connection issuing requests back to back
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline and remaining[0] > 0:
+            remaining[0] -= 1
+            target = random.choice(targets)
+            start = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            await writer.drain()
+            statuses[await read_response(reader)] += 1
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+async def load_test(host, port, connections, duration, requests, unique, fmt):
+    # `unique` distinct payments: a small number mimics a checkout page hit over and over
+    targets = [f"/qr?{urlencode({'pa': f'merchant{i}@upi', 'am': f'{100 + i}.00', 'fmt': fmt})}" for i in range(unique)]
+    latencies = []
+    statuses = Counter()
+    remaining = [requests or float("inf")]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, targets, start + duration, remaining, latencies, statuses)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(latencies)} requests in {elapsed:.2f}s over {connections} connections ({unique} distinct payloads)")
+    print(f"throughput: {len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        print("latency: " + "  ".join(f"p{pct}={percentile(latencies, pct) * 1000:.2f}ms" for pct in (50, 90, 99))
+              + f"  max={max(latencies) * 1000:.2f}ms")
+    print("status codes: " + ", ".join(f"{status}={count}" for status, count in sorted(statuses.items())))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for qr_server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=32, help="Concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=None, help="Stop after this many requests")
+    parser.add_argument("--unique", type=int, default=100, help="Number of distinct payment QR codes requested")
+    parser.add_argument("--fmt", choices=("png", "svg"), default="png")
+    args = parser.parse_args()
+
+    asyncio.run(load_test(args.host, args.port, args.connections, args.duration, args.requests, args.unique, args.fmt))
@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import hashlib
+import math
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from payment_QR import build_upi_url, encode_qr, render_qr
+
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+# A QR image is fully determined by its query, so clients and proxies may keep it for a day
+CACHE_CONTROL = "public, max-age=86400, immutable"
+
+def render_payment_qr(upi_payment_url, fmt, scale):
+    # Runs in a worker process; encode_qr's LRU cache lives on in each worker between requests
+    return render_qr(encode_qr(upi_payment_url), fmt, scale)
+
+class ResponseCache:
+    """
+    Small LRU of rendered images kept on the event loop, so hot QR codes never reach the pool.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+class QRServer:
+    """
+    Minimal asyncio HTTP/1.1 server for on-demand UPI payment QR codes.
+
+    GET /qr?pa=<upi id>&am=<amount>[&pn=<payee>][&fmt=png|svg][&scale=N]
+    returns the image bytes. Encoding runs in a process pool, off the event loop.
+    """
+
+    def __init__(self, workers=None, cache_entries=4096):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.cache = ResponseCache(cache_entries)
+        self.in_progress = {}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.respond(writer, 400, b"malformed request line\n", keep_alive=False)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                await self.dispatch(writer, method, target, headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, writer, method, target, headers, keep_alive):
+        url = urlsplit(target)
+        if url.path != "/qr":
+            return await self.respond(writer, 404, b"not found\n", keep_alive=keep_alive)
+        if method not in ("GET", "HEAD"):
+            return await self.respond(writer, 405, b"method not allowed\n", keep_alive=keep_alive)
+
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            upi_id = query["pa"]
+            amount = float(query["am"])
+            fmt = query.get("fmt", "png")
+            scale = int(query.get("scale", 6))
+            # float() also accepts "nan", "inf" and negatives, none of which can be paid
+            if not (math.isfinite(amount) and amount > 0) or fmt not in CONTENT_TYPES or not 1 <= scale <= 40:
+                raise ValueError
+        except (KeyError, ValueError):
+            return await self.respond(writer, 400, b"expected /qr?pa=<upi id>&am=<positive amount>[&pn=][&fmt=png|svg][&scale=1-40]\n",
+                                      keep_alive=keep_alive)
+
+        upi_payment_url = build_upi_url(amount, upi_id, query.get("pn", "Payment"))
+        key = (upi_payment_url, fmt, scale)
+        etag = '"' + hashlib.sha1(repr(key).encode()).hexdigest() + '"'
+        cache_headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if headers.get("if-none-match") == etag:
+            return await self.respond(writer, 304, b"", cache_headers, keep_alive=keep_alive)
+
+        body = self.cache.get(key)
+        if body is None:
+            try:
+                body = await self.render(key)
+            except Exception as e:
+                return await self.respond(writer, 500, f"render failed: {e}\n".encode(), keep_alive=keep_alive)
+        cache_headers["Content-Type"] = CONTENT_TYPES[fmt]
+        await self.respond(writer, 200, body, cache_headers, keep_alive=keep_alive, head=method == "HEAD")
+
+    async def render(self, key):
+        # Concurrent requests for the same image share one render
+        future = self.in_progress.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.pool, render_payment_qr, *key)
+            self.in_progress[key] = future
+            try:
+                body = await future
+                self.cache.put(key, body)
+            finally:
+                del self.in_progress[key]
+            return body
+        return await future
+
+    async def respond(self, writer, status, body, headers=None, keep_alive=True, head=False):
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}", f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if status >= 400:
+            lines.append("Content-Type: text/plain")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (b"" if head else body))
+        await writer.drain()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving payment QR codes on http://{host}:{port}/qr?pa=<upi id>&am=<amount>")
+        async with server:
+            await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP service for UPI payment QR codes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="Encoder processes (defaults to the CPU count)")
+    parser.add_argument("--cache-entries", type=int, default=4096, help="Rendered images kept in memory")
+    args = parser.parse_args()
+
+    qr_server = QRServer(workers=args.workers, cache_entries=args.cache_entries)
+    try:
+        asyncio.run(qr_server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        qr_server.pool.shutdown()
@@ -0,0 +1,203 @@
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from array import array
+from datetime import datetime
+
+from transaction_ledger import DEFAULT_LEDGER_PATH, TIMESTAMP_FORMAT
+
+DEFAULT_SKEW = 300
+
+def _paise(amount):
+    # Whole paise avoid float equality problems when matching amounts
+    return round(float(amount) * 100)
+
+def _epoch(timestamp, time_format=TIMESTAMP_FORMAT):
+    if time_format == TIMESTAMP_FORMAT:
+        # fromisoformat parses the ledger's own format many times faster than strptime
+        return datetime.fromisoformat(timestamp.strip()).timestamp()
+    return datetime.strptime(timestamp.strip(), time_format).timestamp()
+
+def _parse(timestamp, amount, upi_id, time_format=TIMESTAMP_FORMAT):
+    """
+    Returns (UPI ID, amount in paise, epoch seconds) for one row.
+
+    Raises:
+        ValueError: If a field is missing or unreadable (e.g. "1,000.00" or nan).
+    """
+    try:
+        return upi_id.strip(), _paise(amount), _epoch(timestamp, time_format)
+    except (AttributeError, OverflowError, TypeError) as e:
+        # Short CSV rows give None fields; nan and inf amounts cannot be rounded
+        raise ValueError(str(e)) from e
+
+def read_ledger(path):
+    """
+    Yields (timestamp, amount, upi_id) rows from a ledger database or a transaction CSV.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline='') as csvfile:
+            for row in csv.DictReader(csvfile):
+                yield row['Timestamp'], row['Amount'], row['UPI ID']
+    else:
+        conn = sqlite3.connect(path)
+        try:
+            yield from conn.execute("SELECT timestamp, amount, upi_id FROM transactions")
+        finally:
+            conn.close()
+
+def read_statement(path, time_column, amount_column, upi_column):
+    with open(path, newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            yield row[time_column], row[amount_column], row[upi_column], row
+
+class Reconciler:
+    """
+    Matches bank/UPI statement rows against ledger entries in near-linear time.
+
+    Ledger entries are indexed by (UPI ID, amount in paise, time bucket), where a
+    bucket is `skew` seconds wide. A statement row only has to look in its own
+    bucket and the two neighbours to find every ledger entry within `skew`
+    seconds, so each lookup costs O(1) on average instead of a scan.
+
+    Each ledger entry can be matched once, to the closest statement row that
+    arrives for it. A statement row whose only candidates are already matched
+    is reported as a duplicate. A row with no candidates at all is unexpected.
+    Ledger entries never matched are missing from the statement. Ledger rows
+    that cannot be read are kept aside in `invalid` instead of indexed.
+    """
+
+    def __init__(self, skew=DEFAULT_SKEW, time_format=TIMESTAMP_FORMAT):
+        if skew <= 0:
+            raise ValueError(f"skew must be positive, got {skew}")
+        self.skew = skew
+        self.time_format = time_format
+        self.index = {}
+        self.entries = []
+        self.epochs = array("d")
+        self.matched = bytearray()
+        self.invalid = []
+
+    def load_ledger(self, rows):
+        for timestamp, amount, upi_id in rows:
+            try:
+                upi, paise, epoch = _parse(timestamp, amount, upi_id)
+            except ValueError:
+                self.invalid.append((timestamp, amount, upi_id))
+                continue
+            key = (upi, paise, int(epoch // self.skew))
+            self.index.setdefault(key, []).append(len(self.entries))
+            self.entries.append((timestamp, amount, upi_id))
+            self.epochs.append(epoch)
+        self.matched = bytearray(len(self.entries))
+
+    def _candidates(self, upi_id, paise, epoch):
+        bucket = int(epoch // self.skew)
+        for neighbour in (bucket - 1, bucket, bucket + 1):
+            for entry in self.index.get((upi_id, paise, neighbour), ()):
+                delta = abs(self.epochs[entry] - epoch)
+                if delta <= self.skew:
+                    yield delta, entry
+
+    def match(self, timestamp, amount, upi_id):
+        """
+        Classifies one statement row.
+
+        Returns:
+            tuple: ("matched", entry), ("duplicate", entry) or ("unexpected", None).
+
+        Raises:
+            ValueError: If the row's timestamp, amount or UPI ID cannot be read.
+        """
+        upi, paise, epoch = _parse(timestamp, amount, upi_id, self.time_format)
+        best_open = best_used = None
+        for delta, entry in self._candidates(upi, paise, epoch):
+            if not self.matched[entry]:
+                if best_open is None or delta < best_open[0]:
+                    best_open = (delta, entry)
+            elif best_used is None or delta < best_used[0]:
+                best_used = (delta, entry)
+        if best_open is not None:
+            self.matched[best_open[1]] = 1
+            return "matched", best_open[1]
+        if best_used is not None:
+            return "duplicate", best_used[1]
+        return "unexpected", None
+
+    def missing(self):
+        for entry, done in enumerate(self.matched):
+            if not done:
+                yield self.entries[entry]
+
+def reconcile(ledger_path, statement_path, skew=DEFAULT_SKEW, time_format=TIMESTAMP_FORMAT,
+              time_column="Timestamp", amount_column="Amount", upi_column="UPI ID", details=None):
+    """
+    Reconciles a statement CSV against the ledger and returns counts per outcome.
+
+    When `details` is a writable stream, every non-matching row is written to it
+    as a JSON line. Statement or ledger rows that cannot be read are counted as
+    "invalid" rather than stopping the run.
+    """
+    reconciler = Reconciler(skew=skew, time_format=time_format)
+    reconciler.load_ledger(read_ledger(ledger_path))
+    counts = {"matched": 0, "duplicate": 0, "unexpected": 0, "missing": 0, "invalid": 0}
+
+    for timestamp, amount, upi_id in reconciler.invalid:
+        counts["invalid"] += 1
+        if details is not None:
+            details.write(json.dumps({"outcome": "invalid",
+                                      "ledger": {"timestamp": timestamp, "amount": amount, "upi_id": upi_id}}) + "\n")
+
+    for timestamp, amount, upi_id, row in read_statement(statement_path, time_column, amount_column, upi_column):
+        error = None
+        try:
+            outcome, entry = reconciler.match(timestamp, amount, upi_id)
+        except ValueError as e:
+            outcome, entry, error = "invalid", None, str(e)
+        counts[outcome] += 1
+        if details is not None and outcome != "matched":
+            record = {"outcome": outcome, "statement": row}
+            if error is not None:
+                record["error"] = error
+            if entry is not None:
+                record["ledger"] = dict(zip(("timestamp", "amount", "upi_id"), reconciler.entries[entry]))
+            details.write(json.dumps(record) + "\n")
+
+    for timestamp, amount, upi_id in reconciler.missing():
+        counts["missing"] += 1
+        if details is not None:
+            details.write(json.dumps({"outcome": "missing",
+                                      "ledger": {"timestamp": timestamp, "amount": amount, "upi_id": upi_id}}) + "\n")
+    return counts
+
+def _positive_seconds(value):
+    seconds = int(value)
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive number of seconds, got {value}")
+    return seconds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile recorded payments against a bank/UPI statement export")
+    parser.add_argument("statement", help="Statement CSV export")
+    parser.add_argument("--ledger", default=DEFAULT_LEDGER_PATH, help="Ledger database, or a transaction_history.csv")
+    parser.add_argument("--skew", type=_positive_seconds, default=DEFAULT_SKEW, help="Allowed timestamp difference in seconds")
+    parser.add_argument("--time-format", default=TIMESTAMP_FORMAT, help="strptime format of statement timestamps")
+    parser.add_argument("--time-column", default="Timestamp")
+    parser.add_argument("--amount-column", default="Amount")
+    parser.add_argument("--upi-column", default="UPI ID")
+    parser.add_argument("--details", help="Write unmatched, duplicate and missing rows as JSON Lines ('-' for stdout)")
+    args = parser.parse_args()
+
+    details = None
+    if args.details:
+        details = sys.stdout if args.details == "-" else open(args.details, "w")
+    try:
+        counts = reconcile(args.ledger, args.statement, skew=args.skew, time_format=args.time_format,
+                           time_column=args.time_column, amount_column=args.amount_column,
+                           upi_column=args.upi_column, details=details)
+    finally:
+        if details not in (None, sys.stdout):
+            details.close()
+    print(", ".join(f"{outcome}: {count}" for outcome, count in counts.items()), file=sys.stderr)
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import sys
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+EXTENSION = ".rdoc"
+MAGIC = b"RDOC1\n"
+CHUNK_SIZE = 2 ** 20
+
+# One worker keeps saves and loads of the same file in the order they were requested
+_io = ThreadPoolExecutor(max_workers=1)
+
+class RichDocument:
+    """
+    Text plus its formatting, independent of any widget.
+
+    Attributes:
+        text (str): The plain text, images excluded.
+        styles (list): Style table; each entry is a JSON value the editor understands.
+        runs (array): Alternating (length, style index) pairs covering `text` in order.
+        block_runs (array): Alternating (block count, style index) pairs over the lines, for
+            editors with paragraph formatting; may be empty.
+        images (list): [offset in text, content hash] pairs, in text order.
+        blobs (dict): Image bytes by content hash; each image is stored once.
+        meta (dict): Anything else the editor wants to keep, such as tag definitions.
+    """
+
+    def __init__(self, text="", styles=None, runs=None, block_runs=None, images=None, blobs=None, meta=None):
+        self.text = text
+        self.styles = styles if styles is not None else []
+        self.runs = runs if runs is not None else array("I")
+        self.block_runs = block_runs if block_runs is not None else array("I")
+        self.images = images if images is not None else []
+        self.blobs = blobs if blobs is not None else {}
+        self.meta = meta if meta is not None else {}
+        self._style_ids = {}
+
+    def style_id(self, style):
+        """
+        Index of a style in the table, adding it the first time it is seen.
+        """
+        key = json.dumps(style, sort_keys=True)
+        index = self._style_ids.get(key)
+        if index is None:
+            index = self._style_ids[key] = len(self.styles)
+            self.styles.append(style)
+        return index
+
+    def add_run(self, length, style):
+        _extend(self.runs, length, style)
+
+    def add_block_run(self, count, style):
+        _extend(self.block_runs, count, style)
+
+    def add_image(self, offset, data):
+        digest = hashlib.sha256(data).hexdigest()
+        self.blobs.setdefault(digest, data)
+        self.images.append([offset, digest])
+        return digest
+
+    def iter_runs(self):
+        """
+        Yields (text, style) for every run.
+        """
+        position = 0
+        for i in range(0, len(self.runs), 2):
+            length = self.runs[i]
+            yield self.text[position:position + length], self.styles[self.runs[i + 1]]
+            position += length
+
+    def iter_block_runs(self):
+        for i in range(0, len(self.block_runs), 2):
+            yield self.block_runs[i], self.styles[self.block_runs[i + 1]]
+
+    def line_starts(self):
+        starts = array("Q", [0])
+        newline = self.text.find("\n")
+        while newline >= 0:
+            starts.append(newline + 1)
+            newline = self.text.find("\n", newline + 1)
+        return starts
+
+    def line_col(self, offset, starts):
+        # 1-based line and 0-based column of a text offset, as Tk indexes count them
+        line = bisect_right(starts, offset) - 1
+        return line + 1, offset - starts[line]
+
+def _extend(runs, length, style):
+    # Adjacent runs with the same style are merged
+    if not length:
+        return
+    if runs and runs[-1] == style:
+        runs[-2] += length
+    else:
+        runs.append(length)
+        runs.append(style)
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+def save(path, document):
+    """
+    Writes a document. Layout: MAGIC, a JSON header line, the UTF-8 text,
+    the runs and block runs as little-endian uint32s, then the image blobs.
+    """
+    text = document.text.encode("utf-8")
+    blobs = list(document.blobs.items())
+    header = {
+        "styles": document.styles,
+        "meta": document.meta,
+        "images": document.images,
+        "text_bytes": len(text),
+        "runs": len(document.runs),
+        "block_runs": len(document.block_runs),
+        "blobs": [[digest, len(data)] for digest, data in blobs],
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(json.dumps(header, separators=(",", ":")).encode("utf-8") + b"\n")
+        view = memoryview(text)
+        for start in range(0, len(text), CHUNK_SIZE):
+            f.write(view[start:start + CHUNK_SIZE])
+        _little_endian(document.runs).tofile(f)
+        _little_endian(document.block_runs).tofile(f)
+        for _, data in blobs:
+            f.write(data)
+    # Replacing at the end means a failed save never leaves a half-written document
+    os.replace(tmp_path, path)
+
+def load(path):
+    """
+    Reads a document written by save().
+
+    Raises:
+        ValueError: If the file is not in this format or is cut short.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a {EXTENSION} document")
+        try:
+            header = json.loads(f.readline())
+            text = f.read(header["text_bytes"]).decode("utf-8")
+            runs = array("I")
+            runs.fromfile(f, header["runs"])
+            block_runs = array("I")
+            block_runs.fromfile(f, header["block_runs"])
+        except (EOFError, KeyError) as e:
+            raise ValueError(f"{path} is damaged: {e!r}") from e
+        if sys.byteorder != "little":
+            runs.byteswap()
+            block_runs.byteswap()
+        blobs = {digest: f.read(size) for digest, size in header["blobs"]}
+    return RichDocument(text, header["styles"], runs, block_runs, header["images"], blobs, header["meta"])
+
+def save_async(path, document):
+    """
+    Saves on the I/O thread. Returns a concurrent.futures.Future.
+    """
+    return _io.submit(save, path, document)
+
+def load_async(path):
+    """
+    Loads on the I/O thread. Returns a Future whose result is the RichDocument.
+    """
+    return _io.submit(load, path)
@@ -0,0 +1,228 @@
+import builtins
+import keyword
+import os
+import re
+
+# Colours and font flags for each token kind, shared by every language
+THEME = {
+    "keyword": {"color": "#0033b3", "bold": True},
+    "builtin": {"color": "#7a3e9d"},
+    "definition": {"color": "#00627a", "bold": True},
+    "decorator": {"color": "#9e880d"},
+    "string": {"color": "#067d17"},
+    "comment": {"color": "#8c8c8c", "italic": True},
+    "number": {"color": "#1750eb"},
+    "constant": {"color": "#0033b3"},
+    "key": {"color": "#871094"},
+    "timestamp": {"color": "#8c8c8c"},
+    "debug": {"color": "#8c8c8c"},
+    "info": {"color": "#1750eb"},
+    "warning": {"color": "#b35c00", "bold": True},
+    "error": {"color": "#c00000", "bold": True},
+    "critical": {"color": "#ffffff", "background": "#c00000", "bold": True},
+}
+
+class Language:
+    """
+    Lexes one line at a time, carrying an integer state between lines.
+
+    All of a language's rules are joined into one regular expression, compiled
+    once when the language is defined, so a line is lexed in a single scan.
+    State 0 means nothing is carried over. Each multiline construct gets its
+    own state (1, 2, ...): when its opening delimiter is not closed on the same
+    line, the rest of the line and the following lines belong to it until the
+    closing pattern is found.
+
+    Args:
+        name (str): Name shown in the editor's Syntax menu.
+        extensions (tuple): File extensions, lowercase with the dot, that select the language.
+        rules (list): (token kind, regular expression) pairs; earlier rules win at the same position.
+        multiline (list): (token kind, opening expression, closing expression) triples,
+            tried before the other rules.
+    """
+
+    def __init__(self, name, extensions, rules, multiline=()):
+        self.name = name
+        self.extensions = tuple(extensions)
+        self.kinds = {}
+        self.openers = {}
+        self.closers = []
+        alternatives = []
+        for state, (kind, opening, closing) in enumerate(multiline, 1):
+            group = f"g{len(alternatives)}"
+            self.kinds[group] = kind
+            self.openers[group] = state
+            self.closers.append((kind, re.compile(closing)))
+            alternatives.append(f"(?P<{group}>{opening})")
+        for kind, expression in rules:
+            group = f"g{len(alternatives)}"
+            self.kinds[group] = kind
+            alternatives.append(f"(?P<{group}>{expression})")
+        self.pattern = re.compile("|".join(alternatives))
+
+    def _close(self, text, position, state, spans, start):
+        # Extends a multiline span from `start` to its closing delimiter, or to the end of the line
+        kind, closer = self.closers[state - 1]
+        match = closer.search(text, position)
+        end = match.end() if match else len(text)
+        if end > start:
+            spans.append((start, end - start, kind))
+        return end, 0 if match else state
+
+    def lex(self, text, state=0):
+        """
+        Lexes one line.
+
+        Args:
+            text (str): The line, without its line break.
+            state (int): State left by the line before.
+
+        Returns:
+            tuple: (list of (start, length, token kind) spans, state for the next line).
+        """
+        spans = []
+        position = 0
+        if state:
+            position, state = self._close(text, 0, state, spans, 0)
+            if state:
+                return spans, state
+        search = self.pattern.search
+        match = search(text, position)
+        while match:
+            group = match.lastgroup
+            opened = self.openers.get(group)
+            if opened:
+                position, state = self._close(text, match.end(), opened, spans, match.start())
+                if state:
+                    break
+            else:
+                spans.append((match.start(), match.end() - match.start(), self.kinds[group]))
+                # An empty match must not stop the scan in place
+                position = max(match.end(), match.start() + 1)
+            match = search(text, position)
+        return spans, state
+
+class YamlLanguage(Language):
+    """
+    YAML, with block scalars (`key: |` or `key: >`) carried across lines.
+
+    The state for a block scalar is BLOCK_SCALAR plus the indentation of the
+    line that opened it; the scalar goes on while lines are blank or indented
+    deeper than that.
+    """
+
+    BLOCK_SCALAR = 1000
+    OPENS_BLOCK = re.compile(r"(?:^|[:\-]\s)\s*[|>][-+0-9]*\s*(?:#.*)?$")
+
+    def lex(self, text, state=0):
+        indent = len(text) - len(text.lstrip(" "))
+        if state >= self.BLOCK_SCALAR:
+            if not text.strip() or indent > state - self.BLOCK_SCALAR:
+                return [(0, len(text), "string")] if text else [], state
+            state = 0
+        spans, state = super().lex(text, state)
+        if self.OPENS_BLOCK.search(text):
+            state = self.BLOCK_SCALAR + indent
+        return spans, state
+
+class LogLanguage(Language):
+    """
+    Log files. Lines with a timestamp or a level start a new entry; other
+    non-empty lines, such as traceback lines, continue the entry above and
+    take its colour when it is an error.
+    """
+
+    CARRIED = ("error", "critical")
+    ENTRY_START = re.compile(r"^\s*(?:\[?\d{4}-\d{2}-\d{2}|\[?\d{2}:\d{2}:\d{2})")
+
+    def lex(self, text, state=0):
+        spans, _ = super().lex(text, 0)
+        levels = [kind for _, _, kind in spans if kind in ("debug", "info", "warning", "error", "critical")]
+        if levels:
+            return spans, self.CARRIED.index(levels[0]) + 1 if levels[0] in self.CARRIED else 0
+        if self.ENTRY_START.match(text) or not text.strip():
+            return spans, 0
+        if state:
+            return [(0, len(text), self.CARRIED[state - 1])], state
+        return spans, 0
+
+_NUMBER = r"\b(?:0[xX][0-9a-fA-F_]+|0[bB][01_]+|0[oO][0-7_]+|\d[\d_]*(?:\.[\d_]*)?(?:[eE][+-]?\d+)?[jJ]?)\b"
+
+PYTHON = Language(
+    "Python",
+    (".py", ".pyw"),
+    [
+        ("comment", r"#.*"),
+        ("string", r"""\b[rRbBuUfF]{0,2}(?:"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?)|(?<!\w)(?:"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?)"""),
+        ("decorator", r"^\s*@[\w.]+"),
+        ("definition", r"(?<=\bdef )\w+|(?<=\bclass )\w+"),
+        ("keyword", r"\b(?:" + "|".join(keyword.kwlist) + r")\b"),
+        ("builtin", r"\b(?:" + "|".join(name for name in dir(builtins) if not name.startswith("_")) + r")\b"),
+        ("number", _NUMBER),
+    ],
+    multiline=[
+        ("string", r'\b[rRbBuUfF]{0,2}"""|(?<!\w)"""', r'(?<!\\)"""'),
+        ("string", r"\b[rRbBuUfF]{0,2}'''|(?<!\w)'''", r"(?<!\\)'''"),
+    ],
+)
+
+JSON = Language(
+    "JSON",
+    (".json", ".geojson", ".ipynb"),
+    [
+        ("key", r'"(?:[^"\\]|\\.)*"(?=\s*:)'),
+        ("string", r'"(?:[^"\\]|\\.)*"?'),
+        ("number", r"-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"),
+        ("constant", r"\b(?:true|false|null)\b"),
+    ],
+)
+
+YAML = YamlLanguage(
+    "YAML",
+    (".yaml", ".yml"),
+    [
+        ("comment", r"(?:^|(?<=\s))#.*"),
+        ("keyword", r"^(?:---|\.\.\.)(?=\s|$)|^\s*-(?=\s|$)"),
+        ("string", r""""(?:[^"\\]|\\.)*"?|'(?:[^']|'')*'?"""),
+        ("key", r"""[^\s#'"{}\[\],&*!|>\-][^#]*?(?=:(?:\s|$))"""),
+        ("decorator", r"[&*][\w\-]+|!\S*"),
+        ("constant", r"\b(?:true|false|yes|no|on|off|null|True|False|Yes|No|On|Off|Null|TRUE|FALSE|NULL)\b|~"),
+        ("number", r"[-+]?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"),
+        ("keyword", r"[|>][-+0-9]*(?=\s*(?:#.*)?$)"),
+    ],
+)
+
+LOG = LogLanguage(
+    "Log",
+    (".log", ".out"),
+    [
+        ("timestamp", r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?|\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"),
+        ("critical", r"\b(?:CRITICAL|FATAL)\b"),
+        ("error", r"\b(?:ERROR|SEVERE)\b"),
+        ("warning", r"\bWARN(?:ING)?\b"),
+        ("info", r"\bINFO\b"),
+        ("debug", r"\b(?:DEBUG|TRACE)\b"),
+        ("string", r'"(?:[^"\\]|\\.)*"'),
+    ],
+)
+
+LANGUAGES = {}
+
+def register_language(language):
+    """
+    Makes a language available to the editor, replacing one with the same name.
+    """
+    LANGUAGES[language.name] = language
+
+for _language in (PYTHON, JSON, YAML, LOG):
+    register_language(_language)
+
+def language_for_path(path):
+    """
+    The registered language for a file's extension, or None for plain text.
+    """
+    extension = os.path.splitext(path or "")[1].lower()
+    for language in LANGUAGES.values():
+        if extension in language.extensions:
+            return language
+    return None
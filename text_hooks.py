@@ -0,0 +1,106 @@
+from collections import namedtuple
+
+# kind is "insert" or "delete". start/end are "line.col" indexes: for an insert,
+# where the text went and where it now ends; for a delete, the range that was
+# removed (as it was before the delete). text is what was inserted or removed.
+Edit = namedtuple("Edit", ["kind", "start", "end", "text"])
+# kind is "add" or "remove"; ranges is a list of (start, end) indexes
+TagChange = namedtuple("TagChange", ["kind", "tag", "ranges"])
+
+def line_of(index):
+    return int(index.split(".", 1)[0])
+
+class TextChangeHook:
+    """
+    Reports every insert and delete made to a tk.Text widget.
+
+    The widget's Tcl command is renamed and replaced by a proxy, so edits are
+    seen no matter where they come from: typing, paste, undo, or program code.
+    Listeners are called after the edit with an Edit tuple, and only the
+    touched range is described, so their cost follows the edit size rather
+    than the document size. Tag listeners are told about tags added or
+    removed, including tags given to insert.
+    """
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.listeners = []
+        self.tag_listeners = []
+        self.original = widget._w + "_original"
+        widget.tk.call("rename", widget._w, self.original)
+        widget.tk.createcommand(widget._w, self._proxy)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def add_tag_listener(self, listener):
+        self.tag_listeners.append(listener)
+
+    def _call(self, *args):
+        return self.widget.tk.call((self.original,) + args)
+
+    def _index(self, index):
+        # Tk never edits past the final newline, so "end" really means "end-1c"
+        index = str(self._call("index", index))
+        if self._call("compare", index, ">", "end-1c"):
+            index = str(self._call("index", "end-1c"))
+        return index
+
+    def _notify(self, edit):
+        for listener in self.listeners:
+            listener(edit)
+
+    def _notify_tags(self, change):
+        for listener in self.tag_listeners:
+            listener(change)
+
+    def _tag_list(self, tags):
+        return list(self.widget.tk.splitlist(tags)) if tags else []
+
+    def _proxy(self, command, *args):
+        if command == "tag" and len(args) >= 4 and args[0] in ("add", "remove") and self.tag_listeners:
+            ranges = [(self._index(args[i]), self._index(args[i + 1])) for i in range(2, len(args) - 1, 2)]
+            result = self._call(command, *args)
+            self._notify_tags(TagChange(args[0], str(args[1]), ranges))
+            return result
+        if command in ("insert", "delete", "replace") and str(self._call("cget", "-state")) != "normal":
+            # A disabled widget ignores edits, so there is nothing to report
+            return self._call(command, *args)
+        if command == "insert" and len(args) >= 2:
+            start = self._index(args[0])
+            text = "".join(args[1::2])
+            result = self._call(command, *args)
+            if text:
+                self._notify(Edit("insert", start, self._index(f"{start}+{len(text)}c"), text))
+            if self.tag_listeners:
+                # insert index chars ?tagList chars tagList ...?
+                offset = 0
+                for i in range(1, len(args), 2):
+                    chunk = args[i]
+                    tags = self._tag_list(args[i + 1]) if i + 1 < len(args) else []
+                    if chunk and tags:
+                        first, last = f"{start}+{offset}c", f"{start}+{offset + len(chunk)}c"
+                        for tag in tags:
+                            self._notify_tags(TagChange("add", tag, [(self._index(first), self._index(last))]))
+                    offset += len(chunk)
+            return result
+        if command == "delete" and args:
+            # Multi-range deletes are split up, last range first, so every reported range is exact
+            ranges = [(args[i], args[i + 1] if i + 1 < len(args) else None) for i in range(0, len(args), 2)]
+            edits = []
+            for first, last in ranges:
+                start = self._index(first)
+                end = self._index(last) if last is not None else self._index(f"{start}+1c")
+                if self._call("compare", start, "<", end):
+                    edits.append((start, end))
+            result = None
+            for start, end in sorted(edits, key=lambda r: tuple(map(int, r[0].split("."))), reverse=True):
+                text = str(self._call("get", start, end))
+                result = self._call("delete", start, end)
+                self._notify(Edit("delete", start, end, text))
+            return result
+        if command == "replace" and len(args) >= 3:
+            start, end = self._index(args[0]), self._index(args[1])
+            self._proxy("delete", start, end)
+            return self._proxy("insert", start, *args[2:])
+        return self._call(command, *args)
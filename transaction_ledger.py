@@ -0,0 +1,201 @@
+import argparse
+import csv
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+DEFAULT_LEDGER_PATH = "transactions.db"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+class TransactionLedger:
+    """
+    SQLite (WAL mode) transaction store with group commit.
+
+    Writes from any number of threads are queued and committed together by
+    a single writer thread, one transaction per batch, so the per-commit fsync
+    is shared by every row in the batch. Timestamps use the same
+    "YYYY-MM-DD HH:MM:SS" text as the old CSV log; that format sorts
+    chronologically, so the indexes on (upi_id, timestamp) and (timestamp)
+    turn date-range lookups into index range scans.
+
+    Args:
+        path (str): Database file.
+        batch_size (int): Most rows committed in one transaction.
+        flush_interval (float): How long the writer lingers for more rows before committing.
+            The default of 0 commits whatever is queued right away; rows that arrive
+            during a commit still share the next one.
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH, batch_size=500, flush_interval=0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL keeps committed data across application crashes and only risks the
+        # last commits on power loss, at a fraction of FULL's fsync cost
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS transactions ("
+            " id INTEGER PRIMARY KEY,"
+            " timestamp TEXT NOT NULL,"
+            " amount REAL NOT NULL,"
+            " upi_id TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS transactions_upi_time ON transactions (upi_id, timestamp);"
+            "CREATE INDEX IF NOT EXISTS transactions_time ON transactions (timestamp);"
+            # How many rows of each imported CSV are already in the ledger
+            "CREATE TABLE IF NOT EXISTS imports ("
+            " source TEXT PRIMARY KEY,"
+            " imported_rows INTEGER NOT NULL);"
+        )
+        self.conn.commit()
+        self.read_lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, name="ledger-writer", daemon=True)
+        self.writer.start()
+
+    def _write_loop(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            try:
+                while len(batch) < self.batch_size:
+                    if self.flush_interval:
+                        item = self.pending.get(timeout=self.flush_interval)
+                    else:
+                        item = self.pending.get_nowait()
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        rows = [row for row, _ in batch if row is not None]
+        error = None
+        try:
+            with self.read_lock, self.conn:
+                self.conn.executemany("INSERT INTO transactions (timestamp, amount, upi_id) VALUES (?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            error = e
+        for _, done in batch:
+            if done is not None:
+                done.error = error
+                done.set()
+
+    def record(self, amount, upi_id, timestamp=None, wait=True):
+        """
+        Queues a transaction for the next group commit.
+
+        Args:
+            wait (bool): Block until the row's batch has been committed (the default).
+                Pass False for fire-and-forget writes; call flush() to wait for them.
+        """
+        timestamp = timestamp or datetime.now().strftime(TIMESTAMP_FORMAT)
+        done = threading.Event() if wait else None
+        self.pending.put(((timestamp, float(amount), upi_id), done))
+        if done is not None:
+            done.wait()
+            if done.error is not None:
+                raise done.error
+
+    def flush(self):
+        # An empty marker rides the queue behind everything already submitted
+        done = threading.Event()
+        self.pending.put((None, done))
+        done.wait()
+
+    def import_csv(self, csv_path, chunk_size=10000):
+        """
+        Imports a CSV written by the old store_transaction (columns Timestamp,
+        Amount, UPI ID). Returns the number of rows imported.
+
+        The ledger remembers how many rows of each file it has imported, so
+        importing the same file again only adds rows appended since.
+        """
+        source = os.path.abspath(csv_path)
+        count = 0
+        with open(csv_path, newline='') as csvfile, self.read_lock, self.conn:
+            done = self.conn.execute("SELECT imported_rows FROM imports WHERE source = ?", (source,)).fetchone()
+            skip = done[0] if done else 0
+            chunk = []
+            for index, row in enumerate(csv.DictReader(csvfile)):
+                if index < skip:
+                    continue
+                chunk.append((row['Timestamp'], float(row['Amount']), row['UPI ID']))
+                if len(chunk) >= chunk_size:
+                    self.conn.executemany("INSERT INTO transactions (timestamp, amount, upi_id) VALUES (?, ?, ?)", chunk)
+                    count += len(chunk)
+                    chunk = []
+            self.conn.executemany("INSERT INTO transactions (timestamp, amount, upi_id) VALUES (?, ?, ?)", chunk)
+            count += len(chunk)
+            # Recorded in the same transaction as the rows, so a failed import is retried in full
+            self.conn.execute("INSERT OR REPLACE INTO imports (source, imported_rows) VALUES (?, ?)",
+                              (source, skip + count))
+        return count
+
+    def _query(self, sql, params):
+        with self.read_lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def payments_to(self, upi_id, start=None, end=None):
+        """
+        Returns (timestamp, amount, upi_id) rows for one UPI ID, optionally within [start, end).
+        """
+        sql = "SELECT timestamp, amount, upi_id FROM transactions WHERE upi_id = ?"
+        params = [upi_id]
+        if start:
+            sql += " AND timestamp >= ?"
+            params.append(_format(start))
+        if end:
+            sql += " AND timestamp < ?"
+            params.append(_format(end))
+        return self._query(sql + " ORDER BY timestamp", params)
+
+    def between(self, start, end):
+        """
+        Returns every transaction with start <= timestamp < end.
+        """
+        return self._query("SELECT timestamp, amount, upi_id FROM transactions WHERE timestamp >= ? AND timestamp < ?"
+                           " ORDER BY timestamp", (_format(start), _format(end)))
+
+    def close(self):
+        self.pending.put(None)
+        self.writer.join()
+        self.conn.close()
+
+def _format(value):
+    return value.strftime(TIMESTAMP_FORMAT) if isinstance(value, datetime) else value
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transaction ledger")
+    parser.add_argument("--db", default=DEFAULT_LEDGER_PATH, help="Ledger database file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Import a transaction_history.csv file")
+    import_parser.add_argument("csv", nargs="?", default="transaction_history.csv")
+    query_parser = subparsers.add_parser("query", help="List payments to a UPI ID")
+    query_parser.add_argument("upi_id")
+    query_parser.add_argument("--days", type=int, default=7, help="How many days back to look")
+    args = parser.parse_args()
+
+    ledger = TransactionLedger(args.db)
+    try:
+        if args.command == "import":
+            print(f"Imported {ledger.import_csv(args.csv)} transactions into {args.db}")
+        else:
+            since = datetime.now() - timedelta(days=args.days)
+            rows = ledger.payments_to(args.upi_id, start=since)
+            for timestamp, amount, upi_id in rows:
+                print(f"{timestamp}  {amount:>10.2f}  {upi_id}")
+            print(f"{len(rows)} payments, total {sum(row[1] for row in rows):.2f}")
+    finally:
+        ledger.close()
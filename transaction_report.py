@@ -0,0 +1,210 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+from datetime import date
+
+CHUNK_SIZE = 8 * 2 ** 20
+# The start of the file is fingerprinted to tell an appended-to file from a replaced one
+HEAD_BYTES = 4096
+# Percentiles come from log-spaced buckets, each GROWTH wide: at most 1% relative error,
+# and a group's memory depends on the range of amounts, not on how many rows it has
+GROWTH = 1.02
+_LOG_GROWTH = math.log(GROWTH)
+PERCENTILES = (50, 90, 99)
+
+class Aggregate:
+    """
+    Running count, total, min, max and an approximate amount distribution for one group.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.buckets = {}
+
+    def add(self, amount):
+        self.count += 1
+        self.total += amount
+        if self.minimum is None or amount < self.minimum:
+            self.minimum = amount
+        if self.maximum is None or amount > self.maximum:
+            self.maximum = amount
+        bucket = math.floor(math.log(amount) / _LOG_GROWTH) if amount > 0 else None
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, pct):
+        rank = pct / 100 * self.count
+        seen = 0
+        # The non-positive bucket (None) sorts first
+        for bucket in sorted(self.buckets, key=lambda b: -math.inf if b is None else b):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                if bucket is None:
+                    return max(self.minimum, 0.0)
+                # Geometric middle of the bucket, clamped to what was actually seen
+                return min(self.maximum, max(self.minimum, GROWTH ** (bucket + 0.5)))
+        return self.maximum
+
+    def to_dict(self):
+        return {"count": self.count, "total": self.total, "min": self.minimum, "max": self.maximum,
+                "buckets": {("none" if b is None else str(b)): n for b, n in self.buckets.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregate = cls()
+        aggregate.count = data["count"]
+        aggregate.total = data["total"]
+        aggregate.minimum = data["min"]
+        aggregate.maximum = data["max"]
+        aggregate.buckets = {(None if b == "none" else int(b)): n for b, n in data["buckets"].items()}
+        return aggregate
+
+    def summary(self):
+        result = {"count": self.count, "total": round(self.total, 2), "min": self.minimum, "max": self.maximum}
+        for pct in PERCENTILES:
+            result[f"p{pct}"] = round(self.percentile(pct), 2) if self.count else None
+        return result
+
+class TransactionReport:
+    """
+    One-pass daily, weekly and per-UPI-ID aggregates over a transaction CSV
+    (Timestamp, Amount, UPI ID).
+
+    The file is read in fixed-size binary chunks from a byte offset, so memory
+    does not depend on the file size. `offset` only ever points just past a
+    complete line. Saving it with the aggregates (see save/load) lets the next
+    run process only the rows appended since. A hash of the file's first
+    bytes is saved too, so a truncated, rotated or replaced file is noticed
+    and aggregated from scratch instead of resumed mid-stream.
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.head = None
+        self.groups = {"daily": {}, "weekly": {}, "upi_id": {}}
+        self._weeks = {}
+
+    def _week(self, day):
+        week = self._weeks.get(day)
+        if week is None:
+            year, number, _ = date.fromisoformat(day).isocalendar()
+            week = self._weeks[day] = f"{year}-W{number:02d}"
+        return week
+
+    def _add(self, kind, key, amount):
+        group = self.groups[kind].get(key)
+        if group is None:
+            group = self.groups[kind][key] = Aggregate()
+        group.add(amount)
+
+    def _consume(self, lines):
+        for line in lines:
+            fields = line.split(b",")
+            if len(fields) < 3 or fields[0] == b"Timestamp":
+                continue
+            # Rows with an unreadable amount, timestamp or UPI ID are skipped
+            try:
+                amount = float(fields[1])
+                day = fields[0][:10].decode()
+                week = self._week(day)
+                upi_id = b",".join(fields[2:]).strip().decode()
+            except ValueError:
+                continue
+            self._add("daily", day, amount)
+            self._add("weekly", week, amount)
+            self._add("upi_id", upi_id, amount)
+
+    def update(self, path, chunk_size=CHUNK_SIZE, final=True):
+        """
+        Processes every line after the saved offset. Returns the number of bytes read.
+
+        With final=False, a last line without a newline is left for the next
+        run, since it may still be being written; incremental runs use this.
+        """
+        with open(path, "rb") as f:
+            if self.offset and (os.fstat(f.fileno()).st_size < self.offset or _head(f, self.offset) != self.head):
+                # The file was truncated or replaced: start over
+                self.__init__()
+            start = self.offset
+            f.seek(self.offset)
+            tail = b""
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                data = tail + chunk
+                end = data.rfind(b"\n")
+                if end < 0:
+                    tail = data
+                    continue
+                self._consume(data[:end].replace(b"\r", b"").split(b"\n"))
+                self.offset += end + 1
+                tail = data[end + 1:]
+            if final and tail:
+                self._consume([tail.replace(b"\r", b"")])
+                self.offset += len(tail)
+            self.head = _head(f, self.offset)
+        return self.offset - start
+
+    def save(self, state_path, source_path):
+        state = {"source": os.path.abspath(source_path), "offset": self.offset, "head": self.head,
+                 "groups": {kind: {key: agg.to_dict() for key, agg in groups.items()}
+                            for kind, groups in self.groups.items()}}
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    @classmethod
+    def load(cls, state_path, source_path):
+        report = cls()
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                state = json.load(f)
+            if state.get("source") == os.path.abspath(source_path):
+                report.offset = state["offset"]
+                report.head = state.get("head")
+                report.groups = {kind: {key: Aggregate.from_dict(agg) for key, agg in groups.items()}
+                                 for kind, groups in state["groups"].items()}
+        return report
+
+    def summary(self, kind):
+        return {key: agg.summary() for key, agg in sorted(self.groups[kind].items())}
+
+def _head(f, offset):
+    # Digest of the first bytes already processed; they never change while the file is only appended to
+    f.seek(0)
+    return hashlib.blake2b(f.read(min(offset, HEAD_BYTES)), digest_size=16).hexdigest()
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    print(f"{'':24} {'count':>8} {'total':>14} {'min':>10} {'max':>10} " + " ".join(f"{'p' + str(p):>10}" for p in PERCENTILES))
+    for key, row in rows.items():
+        percentiles = " ".join(f"{row['p' + str(p)]:>10.2f}" for p in PERCENTILES)
+        print(f"{key:24} {row['count']:>8} {row['total']:>14.2f} {row['min']:>10.2f} {row['max']:>10.2f} {percentiles}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily, weekly and per-UPI-ID totals over the transaction history")
+    parser.add_argument("csv", nargs="?", default="transaction_history.csv")
+    parser.add_argument("--group", choices=("daily", "weekly", "upi_id"), nargs="+", default=["daily", "weekly", "upi_id"])
+    parser.add_argument("--incremental", action="store_true", help="Resume from the saved offset and aggregates")
+    parser.add_argument("--state", help="State file for --incremental (default: CSV.report-state.json)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    state_path = args.state or args.csv + ".report-state.json"
+    report = TransactionReport.load(state_path, args.csv) if args.incremental else TransactionReport()
+    processed = report.update(args.csv, final=not args.incremental)
+    if args.incremental:
+        report.save(state_path, args.csv)
+
+    if args.json:
+        print(json.dumps({kind: report.summary(kind) for kind in args.group}, indent=2))
+    else:
+        print(f"Processed {processed} new bytes of {args.csv}")
+        for kind in args.group:
+            print_table(kind, report.summary(kind))
@@ -0,0 +1,163 @@
+import argparse
+import mmap
+import os
+import string
+import struct
+import sys
+import time
+from array import array
+
+def _user_cache_dir():
+    if os.name == "nt":
+        return os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches")
+    return os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+
+# Per user, so the index does not land in whatever directory the editor was started from
+DEFAULT_INDEX_PATH = os.path.join(_user_cache_dir(), "python-others", "spell_words.idx")
+MAGIC = b"WORDIDX1"
+# Magic, word count, longest word length
+HEADER = struct.Struct("=8sII")
+
+def build_word_index(words, path=DEFAULT_INDEX_PATH):
+    """
+    Writes a sorted word list in the on-disk format read by WordIndex.
+
+    Layout: header, (count + 1) native uint32 offsets, then the UTF-8 words
+    back to back. The offsets use the machine's byte order, so an index is
+    meant to be built on the machine that uses it.
+
+    Returns:
+        int: The number of words written.
+    """
+    encoded = sorted({word.lower().encode("utf-8") for word in words})
+    offsets = array("I", [0])
+    for word in encoded:
+        offsets.append(offsets[-1] + len(word))
+    longest = max((len(word.decode("utf-8")) for word in encoded), default=0)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(encoded), longest))
+        offsets.tofile(f)
+        f.write(b"".join(encoded))
+    os.replace(tmp_path, path)
+    return len(encoded)
+
+class WordIndex:
+    """
+    Read-only, memory-mapped word list with binary-search lookups.
+
+    Opening costs one mmap call no matter how many words the index holds, and
+    pages are only read from disk as lookups touch them. unknown() follows
+    pyspellchecker's SpellChecker.unknown, so it can stand in for it.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.longest = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a word index")
+        offsets_end = HEADER.size + 4 * (self.count + 1)
+        self.offsets = memoryview(self.map)[HEADER.size:offsets_end].cast("I")
+        self.words_start = offsets_end
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, word):
+        key = word.lower().encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            start = self.words_start + self.offsets[middle]
+            found = self.map[start:self.words_start + self.offsets[middle + 1]]
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return True
+        return False
+
+    def _should_check(self, word):
+        # Same exemptions as SpellChecker: lone punctuation, overlong tokens and numbers
+        if len(word) == 1 and word in string.punctuation:
+            return False
+        if len(word) > self.longest + 3:
+            return False
+        if word.lower() in ("nan", "inf", "infinity"):
+            return True
+        try:
+            float(word)
+            return False
+        except ValueError:
+            return True
+
+    def unknown(self, words):
+        """
+        Returns the lowercased words that are not in the index.
+        """
+        return {word.lower() for word in words if self._should_check(word) and word not in self}
+
+    def close(self):
+        # The offsets view must be released before the mapping can close
+        if hasattr(self, "offsets"):
+            self.offsets.release()
+        self.map.close()
+        self.file.close()
+
+def _dictionary_source(language):
+    import spellchecker
+    return os.path.join(os.path.dirname(spellchecker.__file__), "resources", f"{language}.json.gz")
+
+def load_word_index(path=DEFAULT_INDEX_PATH, language="en"):
+    """
+    Opens the word index, first building it from pyspellchecker's dictionary
+    when it is missing or older than that dictionary. A damaged index is
+    rebuilt once. If the index still cannot be built or opened, the problem is
+    reported on stderr and pyspellchecker's in-memory SpellChecker is returned
+    instead, which answers the same unknown() calls.
+    """
+    from spellchecker import SpellChecker
+    source = _dictionary_source(language)
+    try:
+        if not os.path.exists(path) or (os.path.exists(source) and os.path.getmtime(path) < os.path.getmtime(source)):
+            build_word_index(SpellChecker(language=language).word_frequency.keys(), path)
+        try:
+            return WordIndex(path)
+        except (ValueError, struct.error):
+            build_word_index(SpellChecker(language=language).word_frequency.keys(), path)
+            return WordIndex(path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Word index {path} is unavailable ({e}); using the in-memory dictionary", file=sys.stderr)
+        return SpellChecker(language=language)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the spell checker's compact word index")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Word index file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Build the index from pyspellchecker's dictionary")
+    build_parser.add_argument("--language", default="en")
+    lookup_parser = subparsers.add_parser("lookup", help="Print which words are unknown")
+    lookup_parser.add_argument("words", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from spellchecker import SpellChecker
+        start = time.perf_counter()
+        count = build_word_index(SpellChecker(language=args.language).word_frequency.keys(), args.index)
+        print(f"Wrote {count} words to {args.index} ({os.path.getsize(args.index)} bytes) in {time.perf_counter() - start:.2f}s")
+    else:
+        start = time.perf_counter()
+        index = WordIndex(args.index)
+        opened = time.perf_counter() - start
+        unknown = index.unknown(args.words)
+        for word in args.words:
+            print(f"{word}: {'unknown' if word.lower() in unknown else 'ok'}")
+        print(f"Opened {len(index)} words in {opened * 1000:.2f} ms")
+        index.close()